@@ -0,0 +1,131 @@
+import os
+import struct
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+# One manifest entry per image the game uses. ``size`` is the target size the image
+# is scaled to; ``alpha`` picks convert_alpha over convert and ``fallback`` is the fill
+# color used when the file can't be loaded.
+AssetSpec = namedtuple("AssetSpec", "filename size alpha smooth fallback", defaults=(True, False, (200, 200, 200)))
+
+# Cached surfaces are raw RGBA pixels behind a small header: source mtime, width, height
+CACHE_HEADER = struct.Struct("<qII")
+
+
+class AssetManager:
+    """
+    Loads every image in a manifest in parallel and keeps scaled copies on disk.
+
+    Each source file is decoded at most once no matter how many entries use it, and
+    each (file, size, scaling) pair is scaled at most once. Scaled pixels are cached in
+    ``cache_dir`` keyed by the source mtime and target size, so later starts skip both
+    PNG decoding and rescaling. Surfaces are converted to the display format on the
+    calling thread, so the display must be set up before ``load`` is called.
+    """
+
+    def __init__(self, asset_dir, cache_dir=None, workers=None):
+        self.asset_dir = asset_dir
+        self.cache_dir = cache_dir
+        self.workers = workers
+
+    def load(self, manifest):
+        # Group the distinct (size, scaling) variants by source file, one task per file
+        variants = {}
+        for spec in manifest.values():
+            keys = variants.setdefault(spec.filename, [])
+            key = (spec.filename, tuple(spec.size), spec.smooth)
+            if key not in keys:
+                keys.append(key)
+
+        scaled = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for result in pool.map(self.load_file, variants.values()):
+                scaled.update(result)
+
+        images = {}
+        converted = {}
+        for name, spec in manifest.items():
+            key = (spec.filename, tuple(spec.size), spec.smooth)
+            surface = scaled[key]
+            if surface is None:
+                surface = pygame.Surface(spec.size)
+                surface.fill(spec.fallback)
+                images[name] = surface
+                continue
+            convert_key = key + (spec.alpha,)
+            if convert_key not in converted:
+                converted[convert_key] = surface.convert_alpha() if spec.alpha else surface.convert()
+            images[name] = converted[convert_key]
+        return images
+
+    def load_file(self, keys):
+        """Returns {key: scaled surface or None} for every variant of one source file."""
+        filename = keys[0][0]
+        path = os.path.join(self.asset_dir, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError as e:
+            print(f"Error loading {filename}: {e}")
+            return {key: None for key in keys}
+
+        results = {}
+        source = None
+        for key in keys:
+            _, size, smooth = key
+            cache_path = self.cache_path(key)
+            surface = self.read_cache(cache_path, mtime, size)
+            if surface is None:
+                if source is None:
+                    try:
+                        source = pygame.image.load(path)
+                    except pygame.error as e:
+                        print(f"Error loading {filename}: {e}")
+                        return {key: None for key in keys}
+                if source.get_size() == size:
+                    surface = source.copy()
+                elif smooth and source.get_bitsize() in (24, 32):
+                    surface = pygame.transform.smoothscale(source, size)
+                else:
+                    surface = pygame.transform.scale(source, size)
+                self.write_cache(cache_path, mtime, surface)
+            results[key] = surface
+        return results
+
+    def cache_path(self, key):
+        if self.cache_dir is None:
+            return None
+        filename, size, smooth = key
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(self.cache_dir, f"{stem}-{size[0]}x{size[1]}-{'smooth' if smooth else 'fast'}.rgba")
+
+    def read_cache(self, cache_path, mtime, size):
+        if cache_path is None:
+            return None
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < CACHE_HEADER.size:
+            return None
+        cached_mtime, width, height = CACHE_HEADER.unpack_from(data)
+        pixels = data[CACHE_HEADER.size:]
+        if cached_mtime != mtime or (width, height) != size or len(pixels) != width * height * 4:
+            return None
+        return pygame.image.frombuffer(pixels, size, "RGBA")
+
+    def write_cache(self, cache_path, mtime, surface):
+        if cache_path is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pixels = pygame.image.tostring(surface, "RGBA")
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(CACHE_HEADER.pack(mtime, *surface.get_size()))
+                f.write(pixels)
+            os.replace(tmp_path, cache_path)
+        except (OSError, pygame.error) as e:
+            print(f"Error caching {os.path.basename(cache_path)}: {e}")
@@ -0,0 +1,284 @@
+"""
+Headless rendering benchmarks.
+
+Runs the game's draw functions against the SDL dummy video and audio drivers on
+synthetic boards of growing size and particle systems of growing population, and
+reports the per-call cost of each. Results are written as JSON and compared against
+a stored baseline; any case slower than the baseline by more than the tolerance is
+reported as a regression and makes the script exit with status 1, as does any
+budgeted case whose median does not fit in one frame at the game's FPS.
+
+    python benchmark.py                      # run, save benchmark_results.json, compare
+    python benchmark.py --save-baseline      # run and store the results as the baseline
+    python benchmark.py --quick              # fewer iterations and sizes
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from time import perf_counter_ns
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import main as game
+from simulation import GameState, DIRECTIONS
+from board import RESOURCE_TYPES, BUILDING_TYPES, OBSTACLE_TYPES
+from history import ScoreHistory
+
+GRID_SIZES = [10, 50, 200, 1000]
+PARTICLE_COUNTS = [100, 1000, 10000, 50000]
+QUICK_GRID_SIZES = [10, 200]
+QUICK_PARTICLE_COUNTS = [100, 10000]
+# Share of the board covered by resources, buildings and obstacles
+BOARD_DENSITY = 0.2
+SEED = 1234
+
+DEFAULT_RESULTS = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.25
+# Cases that must fit in one frame on their own, whatever the baseline says
+FRAME_BUDGET_MS = 1000 / game.FPS
+BUDGET_CASES = ["particles_draw/count=10000"]
+
+
+def measure(fn, iterations, warmup=10, setup=None):
+    """Times ``iterations`` calls of ``fn``; ``setup`` runs untimed before every call."""
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = perf_counter_ns()
+        fn()
+        samples.append(perf_counter_ns() - start)
+    samples = np.array(samples) / 1e6
+    mean = float(samples.mean())
+    return {
+        "iterations": iterations,
+        "mean_ms": round(mean, 4),
+        "median_ms": round(float(np.median(samples)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "calls_per_second": round(1000.0 / mean, 1) if mean > 0 else None
+    }
+
+
+def synthetic_match(size, seed=SEED):
+    """A running match on a ``size`` x ``size`` board with BOARD_DENSITY of it occupied."""
+    state = GameState(grid_size=size, seed=seed)
+    state.reset("Hard", duration=10 ** 6)
+    rng = random.Random(seed)
+    board = state.board
+    cells = board.free_cells.sample(rng, int(size * size * BOARD_DENSITY), state.player_cells())
+    for i, cell in enumerate(cells):
+        kind = i % 3
+        if kind == 0:
+            board.set_resource(cell, rng.choice(RESOURCE_TYPES), rng.randint(1, 5))
+        elif kind == 1:
+            board.set_building(cell, rng.choice(BUILDING_TYPES), rng.randint(1, 2))
+        else:
+            board.set_obstacle(cell, rng.choice(OBSTACLE_TYPES))
+    state.drain_changed_cells()
+    return state
+
+
+def wandering_inputs(rng):
+    directions = list(DIRECTIONS)
+    return lambda: {player_id: (rng.choice(directions), []) for player_id in (1, 2)}
+
+
+def use_match(state):
+    game.sim = state
+    game.cameras = game.create_cameras()
+    game.game_state["screen"] = "playing"
+
+
+def bench_grid(size, iterations):
+    use_match(synthetic_match(size))
+    inputs = wandering_inputs(random.Random(SEED))
+    results = {}
+    # Players wander and collect between frames, so the cameras scroll and redraw changed tiles
+    step = lambda: game.sim.step(1 / game.TICK_RATE, inputs())
+    results[f"draw_grid/grid={size}"] = measure(game.draw_grid, iterations, setup=step)
+
+    def frame():
+        game.sim.step(1 / game.TICK_RATE, inputs())
+        game.handle_sim_events()
+        game.screen.blit(game.background_image, (0, 0))
+        game.draw_grid()
+        game.draw_units()
+        game.draw_ui()
+        game.effect_particles.update()
+        game.presenter.track("particles", game.draw_effect_particles())
+        game.sounds.flush()
+        game.presenter.present()
+
+    results[f"playing_frame/grid={size}"] = measure(frame, iterations)
+
+    # Split screen draws two cameras, each with its own player's fog
+    camera_mode = game.CAMERA_MODE
+    game.CAMERA_MODE = "split"
+    game.cameras = game.create_cameras()
+    results[f"draw_grid_split/grid={size}"] = measure(game.draw_grid, iterations, setup=step)
+    game.CAMERA_MODE = camera_mode
+    game.cameras = game.create_cameras()
+    return results
+
+
+def bench_ui(iterations):
+    use_match(synthetic_match(game.VIEW_TILES))
+    counter = iter(range(10 ** 9))
+
+    def change_scores():
+        # A HUD value changes every few frames, as it does during a match
+        n = next(counter)
+        if n % 10 == 0:
+            game.sim.players[n % 2].resources["Points"] += 1
+
+    return {"draw_ui": measure(game.draw_ui, iterations, setup=change_scores)}
+
+
+def bench_screens(iterations, workdir):
+    # A long synthetic history, so paging cost is measured rather than a tiny file
+    store = ScoreHistory(os.path.join(workdir, "history.log"), os.path.join(workdir, "history.idx"))
+    winners = ["Blue", "Red", "Draw"]
+    for i in range(10000):
+        store.append(winners[i % 3], 10 + i % 50, 12 + i % 40)
+    game.score_store = store
+    game.history_page = 3
+    results = {}
+    for name in ("draw_start_screen", "draw_game_rule_screen", "draw_history_screen"):
+        game.game_state["screen"] = name[len("draw_"):-len("_screen")]
+        results[name] = measure(getattr(game, name), iterations)
+    store.close()
+    return results
+
+
+def bench_particles(count, iterations):
+    system = game.ParticleSystem(capacity=count, seed=SEED)
+    rng = system.rng
+
+    def refill():
+        missing = count - len(system)
+        if missing > 0:
+            life = rng.integers(30, 101, missing)
+            alpha = rng.integers(50, 256, missing)
+            # A coarse palette, as the game's emitters use, so sprites are shared
+            color = rng.integers(0, 4, (missing, 3)) * 85
+            system.emit(
+                rng.integers(0, game.WIDTH, missing), rng.integers(0, game.HEIGHT, missing),
+                rng.uniform(-2, 2, missing), rng.uniform(-2, 2, missing),
+                life, alpha, rng.integers(1, 6, missing), color,
+                gravity=0.1, fade=alpha / life
+            )
+
+    refill()
+    return {
+        f"particles_update/count={count}": measure(system.update, iterations, setup=refill),
+        f"particles_draw/count={count}": measure(lambda: system.draw(game.screen), iterations, setup=refill)
+    }
+
+
+def run(grid_sizes, particle_counts, iterations):
+    results = {}
+    for size in grid_sizes:
+        results.update(bench_grid(size, iterations))
+    results.update(bench_ui(iterations))
+    with tempfile.TemporaryDirectory() as workdir:
+        results.update(bench_screens(iterations, workdir))
+    for count in particle_counts:
+        results.update(bench_particles(count, iterations))
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "iterations": iterations
+        },
+        "results": results
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints current vs baseline medians and returns the names of regressed cases."""
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None or not previous["median_ms"]:
+            print(f"{name:<36} {current['median_ms']:9.3f} ms  (no baseline)")
+            continue
+        ratio = current["median_ms"] / previous["median_ms"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<36} {current['median_ms']:9.3f} ms  baseline {previous['median_ms']:9.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def check_budget(results):
+    """Prints each budgeted case against the frame budget and returns the names over it."""
+    over = []
+    for name in BUDGET_CASES:
+        current = results["results"].get(name)
+        if current is None:
+            continue
+        flag = ""
+        if current["median_ms"] > FRAME_BUDGET_MS:
+            flag = "  OVER BUDGET"
+            over.append(name)
+        print(f"{name:<36} {current['median_ms']:9.3f} ms  budget {FRAME_BUDGET_MS:9.3f} ms{flag}")
+    return over
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless rendering benchmarks")
+    parser.add_argument("--output", default=DEFAULT_RESULTS, help="where to write the JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown of the median before a case counts as a regression")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, grid sizes and particle counts")
+    args = parser.parse_args()
+
+    if args.quick:
+        results = run(QUICK_GRID_SIZES, QUICK_PARTICLE_COUNTS, min(args.iterations, 50))
+    else:
+        results = run(GRID_SIZES, PARTICLE_COUNTS, args.iterations)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        baseline = {"results": {}}
+    regressions = compare(results, baseline, args.tolerance)
+    over_budget = check_budget(results)
+    pygame.quit()
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+    if over_budget:
+        print(f"{len(over_budget)} case(s) over the {FRAME_BUDGET_MS:.1f} ms frame budget")
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
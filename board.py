@@ -0,0 +1,282 @@
+from array import array
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Bit flags in the ``kind`` layer
+EMPTY = 0
+RESOURCE = 1
+BUILDING = 2
+OBSTACLE = 4
+
+# Type layers store 1 + the index into these lists, 0 meaning none
+RESOURCE_TYPES = ["Gold", "Wood"]
+BUILDING_TYPES = ["Gold Mine", "Lumber Mill"]
+OBSTACLE_TYPES = ["Stone", "Bomb", "Spike"]
+
+# Free cell index storage: the array typecode and the NumPy dtype with the same
+# item layout. 'q' is 64-bit everywhere, unlike 'l' (32-bit on Windows).
+CELL_TYPECODE = 'q'
+CELL_DTYPE = np.int64
+
+
+class FreeCellIndex:
+    """
+    Set of board cells with no resource, building or obstacle on them.
+
+    Cells are stored as ``row * size + col`` in a dense array with a position map, so
+    add and remove are O(1) (removal swaps the last cell into the hole) and sampling
+    k cells is O(k) regardless of board size.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        every_cell = np.arange(size * size, dtype=CELL_DTYPE).tobytes()
+        self.cells = array(CELL_TYPECODE)
+        self.cells.frombytes(every_cell)
+        self.positions = array(CELL_TYPECODE)
+        self.positions.frombytes(every_cell)
+
+    @classmethod
+    def from_cells(cls, size, cells):
+        """An index holding ``cells`` (``row * size + col`` keys) in exactly that order."""
+        index = cls.__new__(cls)
+        index.size = size
+        cells = np.asarray(cells, dtype=CELL_DTYPE)
+        positions = np.full(size * size, -1, dtype=CELL_DTYPE)
+        positions[cells] = np.arange(len(cells))
+        index.cells = array(CELL_TYPECODE)
+        index.cells.frombytes(cells.tobytes())
+        index.positions = array(CELL_TYPECODE)
+        index.positions.frombytes(positions.tobytes())
+        return index
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return self.positions[cell[0] * self.size + cell[1]] >= 0
+
+    def add(self, cell):
+        key = cell[0] * self.size + cell[1]
+        if self.positions[key] >= 0:
+            return
+        self.positions[key] = len(self.cells)
+        self.cells.append(key)
+
+    def remove(self, cell):
+        key = cell[0] * self.size + cell[1]
+        index = self.positions[key]
+        if index < 0:
+            return
+        last = self.cells.pop()
+        if last != key:
+            self.cells[index] = last
+            self.positions[last] = index
+        self.positions[key] = -1
+
+    def sample(self, rng, k, exclude=()):
+        """Up to ``k`` distinct free cells, skipping any cell in ``exclude``."""
+        wanted = min(len(self.cells), k + len(exclude))
+        picks = [divmod(self.cells[i], self.size) for i in rng.sample(range(len(self.cells)), wanted)]
+        return [cell for cell in picks if cell not in exclude][:k]
+
+
+class Board:
+    """
+    Occupancy of every cell in typed NumPy layers, a few bytes per cell.
+
+    Cells are addressed as ``(row, col)``; player positions are ``[x, y]`` so use
+    ``cell_of`` to convert. ``resources``, ``buildings`` and ``obstacles`` are
+    dict-like views over the layers keyed by cell; values read from them are copies,
+    so write changes back through the view.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        shape = (size, size)
+        self.kind = np.zeros(shape, dtype=np.uint8)
+        self.resource_type = np.zeros(shape, dtype=np.uint8)
+        self.resource_amount = np.zeros(shape, dtype=np.int16)
+        self.resource_spawn_time = np.zeros(shape, dtype=np.float32)
+        self.building_type = np.zeros(shape, dtype=np.uint8)
+        self.building_owner = np.zeros(shape, dtype=np.uint8)
+        self.building_last_generated = np.zeros(shape, dtype=np.float32)
+        self.obstacle_type = np.zeros(shape, dtype=np.uint8)
+        self.counts = {RESOURCE: 0, BUILDING: 0, OBSTACLE: 0}
+        # {owner: {building type: count}}, kept current on every build and removal
+        self.production = {}
+        self.free_cells = FreeCellIndex(size)
+        # Bumped on every occupancy change, so readers can skip scanning an unchanged board
+        self.revision = 0
+        # Cells whose resource flag was set or cleared since the last drain
+        self.resource_changes = set()
+        self.resources = ResourceView(self)
+        self.buildings = BuildingView(self)
+        self.obstacles = ObstacleView(self)
+
+    @staticmethod
+    def cell_of(pos):
+        return (int(pos[1]), int(pos[0]))
+
+    def rebuild_indexes(self, free_cells=None):
+        """
+        Recomputes counts, production and free cells after the layers were written
+        directly. Sampling depends on the order of the free cell index, so pass the
+        saved order in ``free_cells`` when the result must match the original board.
+        """
+        kind = self.kind
+        self.counts = {flag: int(np.count_nonzero(kind & flag)) for flag in self.counts}
+        self.production = self.building_counts()
+        if free_cells is None:
+            free_cells = np.flatnonzero(kind == EMPTY)
+        self.free_cells = FreeCellIndex.from_cells(self.size, free_cells)
+
+    def in_bounds(self, cell):
+        return 0 <= cell[0] < self.size and 0 <= cell[1] < self.size
+
+    def has(self, cell, flag):
+        return self.in_bounds(cell) and bool(self.kind[cell] & flag)
+
+    def set_flag(self, cell, flag):
+        if not self.kind[cell] & flag:
+            self.counts[flag] += 1
+        self.kind[cell] |= flag
+        self.free_cells.remove(cell)
+        self.revision += 1
+        if flag == RESOURCE:
+            self.resource_changes.add(cell)
+
+    def clear_flag(self, cell, flag):
+        if not self.kind[cell] & flag:
+            raise KeyError(cell)
+        if flag == BUILDING:
+            self.count_building(cell, -1)
+        self.counts[flag] -= 1
+        self.kind[cell] &= ~flag & 0xFF
+        if self.kind[cell] == EMPTY:
+            self.free_cells.add(cell)
+        self.revision += 1
+        if flag == RESOURCE:
+            self.resource_changes.add(cell)
+
+    def drain_resource_changes(self):
+        cells = self.resource_changes
+        self.resource_changes = set()
+        return cells
+
+    def set_resource(self, cell, resource_type, amount, spawn_time=0.0):
+        self.resource_type[cell] = RESOURCE_TYPES.index(resource_type) + 1
+        self.resource_amount[cell] = amount
+        self.resource_spawn_time[cell] = spawn_time
+        self.set_flag(cell, RESOURCE)
+
+    def count_building(self, cell, delta):
+        counts = self.production.setdefault(int(self.building_owner[cell]), dict.fromkeys(BUILDING_TYPES, 0))
+        counts[BUILDING_TYPES[self.building_type[cell] - 1]] += delta
+
+    def set_building(self, cell, building_type, owner, last_generated=0.0):
+        if self.kind[cell] & BUILDING:
+            self.count_building(cell, -1)
+        self.building_type[cell] = BUILDING_TYPES.index(building_type) + 1
+        self.building_owner[cell] = owner
+        self.building_last_generated[cell] = last_generated
+        self.count_building(cell, 1)
+        self.set_flag(cell, BUILDING)
+
+    def set_obstacle(self, cell, obstacle_type):
+        self.obstacle_type[cell] = OBSTACLE_TYPES.index(obstacle_type) + 1
+        self.set_flag(cell, OBSTACLE)
+
+    def cells(self, flag):
+        rows, cols = np.nonzero(self.kind & flag)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def free_mask(self):
+        return self.kind == EMPTY
+
+    def resources_within(self, cell, radius, resource_type=None):
+        """Cells holding a resource (optionally of one type) within ``radius`` of ``cell``."""
+        row, col = cell
+        top, left = max(0, row - radius), max(0, col - radius)
+        bottom, right = min(self.size, row + radius + 1), min(self.size, col + radius + 1)
+        rows, cols = np.ogrid[top:bottom, left:right]
+        mask = (rows - row) ** 2 + (cols - col) ** 2 <= radius * radius
+        mask &= (self.kind[top:bottom, left:right] & RESOURCE) != 0
+        if resource_type is not None:
+            mask &= self.resource_type[top:bottom, left:right] == RESOURCE_TYPES.index(resource_type) + 1
+        found_rows, found_cols = np.nonzero(mask)
+        return list(zip((found_rows + top).tolist(), (found_cols + left).tolist()))
+
+    def building_counts(self, owners=(1, 2)):
+        """{owner: {building type: count}} computed in one pass over the board."""
+        mask = (self.kind & BUILDING) != 0
+        owner = self.building_owner[mask].astype(np.int64)
+        kind = self.building_type[mask].astype(np.int64)
+        width = len(BUILDING_TYPES) + 1
+        counts = np.bincount(owner * width + kind, minlength=(max(owners) + 1) * width)
+        return {o: {name: int(counts[o * width + i + 1]) for i, name in enumerate(BUILDING_TYPES)} for o in owners}
+
+
+class LayerView(MutableMapping):
+    flag = EMPTY
+
+    def __init__(self, board):
+        self.board = board
+
+    def __contains__(self, cell):
+        return isinstance(cell, tuple) and len(cell) == 2 and self.board.has(cell, self.flag)
+
+    def __getitem__(self, cell):
+        if cell not in self:
+            raise KeyError(cell)
+        return self.read(cell)
+
+    def __delitem__(self, cell):
+        self.board.clear_flag(cell, self.flag)
+
+    def __iter__(self):
+        return iter(self.board.cells(self.flag))
+
+    def __len__(self):
+        return self.board.counts[self.flag]
+
+
+class ResourceView(LayerView):
+    flag = RESOURCE
+
+    def read(self, cell):
+        board = self.board
+        return {
+            "type": RESOURCE_TYPES[board.resource_type[cell] - 1],
+            "amount": int(board.resource_amount[cell]),
+            "spawn_time": float(board.resource_spawn_time[cell])
+        }
+
+    def __setitem__(self, cell, resource):
+        self.board.set_resource(cell, resource["type"], resource["amount"], resource.get("spawn_time", 0.0))
+
+
+class BuildingView(LayerView):
+    flag = BUILDING
+
+    def read(self, cell):
+        board = self.board
+        return {
+            "type": BUILDING_TYPES[board.building_type[cell] - 1],
+            "owner": int(board.building_owner[cell]),
+            "last_generated": float(board.building_last_generated[cell])
+        }
+
+    def __setitem__(self, cell, building):
+        self.board.set_building(cell, building["type"], building["owner"], building.get("last_generated", 0.0))
+
+
+class ObstacleView(LayerView):
+    flag = OBSTACLE
+
+    def read(self, cell):
+        return OBSTACLE_TYPES[self.board.obstacle_type[cell] - 1]
+
+    def __setitem__(self, cell, obstacle_type):
+        self.board.set_obstacle(cell, obstacle_type)
@@ -0,0 +1,328 @@
+"""
+Computer-controlled players.
+
+Bots never search paths themselves. One DistanceField per match holds, for every
+cell, the cost of walking to the most attractive resource, and each bot just steps
+to its cheapest neighbor. The field is rebuilt on a new board and otherwise updated
+incrementally from the cells whose resources spawned or got collected, so per-tick
+cost barely depends on the number of bots or the board size.
+
+Bots claim the resource they are heading for, nearest first, and a bot whose
+resource is already claimed routes to the best unclaimed one instead, so two bots
+on one field spread out rather than trailing each other to the same cells.
+"""
+import heapq
+import math
+
+import numpy as np
+
+from board import RESOURCE, OBSTACLE, OBSTACLE_TYPES, RESOURCE_TYPES, Board
+from simulation import BASE_PENALTIES, MODE_MULTIPLIERS, BUILDING_COSTS, DIRECTIONS
+
+# Points one step is worth when trading path length against penalties and rewards
+POINTS_PER_STEP = 10
+# Points for picking up one unit of each resource, mirroring collect_resources
+RESOURCE_POINTS = {"Gold": 50, "Wood": 30}
+UPGRADE_PRIORITY = ["resource_generation", "movement_speed", "vision_radius"]
+# Cells a detour search may settle before giving up and following the field
+ROUTE_SEARCH_LIMIT = 4096
+
+
+class DistanceField:
+    """
+    Multi-source Dijkstra over the board for one match.
+
+    ``dist[i]`` is the cost of the cheapest walk from flat cell ``i`` to a resource:
+    each step costs 1 plus the obstacle penalty of the cell entered (BASE_PENALTIES
+    initial × mode multiplier, in POINTS_PER_STEP units), and each resource starts
+    below zero by its point value, so a richer resource a little further away wins.
+    ``owner[i]`` is the resource cell that cost leads to.
+
+    A new resource only lowers costs, so only the cells it now wins are relaxed. A
+    collected resource invalidates just the cells it owned; those are re-seeded from
+    their neighbors and relaxed again. Changes come from the board's drained
+    ``resource_changes``, so builds and other edits that leave resources alone cost
+    nothing. One field per board: draining hides the changes from anything else.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.generation = None
+        self.size = 0
+        self.cost = []
+        self.dist = []
+        self.owner = []
+        self.sources = {}  # flat cell -> start cost
+        self.obstacle_count = 0
+
+    def neighbors(self, i):
+        size = self.size
+        row, col = divmod(i, size)
+        if row > 0:
+            yield i - size
+        if row < size - 1:
+            yield i + size
+        if col > 0:
+            yield i - 1
+        if col < size - 1:
+            yield i + 1
+
+    def update(self):
+        board = self.state.board
+        if self.generation != self.state.generation or self.obstacle_count != board.counts[OBSTACLE]:
+            self.rebuild()
+            return
+        changed = board.drain_resource_changes()
+        if changed:
+            self.sync_sources(changed)
+
+    def source_cost(self, i):
+        resource_type = RESOURCE_TYPES[self.state.board.resource_type.flat[i] - 1]
+        return -RESOURCE_POINTS[resource_type] * int(self.state.board.resource_amount.flat[i]) / POINTS_PER_STEP
+
+    def rebuild(self):
+        state = self.state
+        board = state.board
+        self.generation = state.generation
+        self.obstacle_count = board.counts[OBSTACLE]
+        self.size = board.size
+        # The full scan below covers every pending change
+        board.drain_resource_changes()
+        multiplier = MODE_MULTIPLIERS.get(state.mode, 1.0)
+        penalties = np.array([0.0] + [BASE_PENALTIES[name]["initial"] * multiplier / POINTS_PER_STEP
+                                      for name in OBSTACLE_TYPES])
+        self.cost = (1.0 + penalties[board.obstacle_type.ravel()]).tolist()
+        self.dist = [math.inf] * (self.size * self.size)
+        self.owner = [-1] * (self.size * self.size)
+        self.sources = {}
+        heap = []
+        for i in np.flatnonzero(board.kind & RESOURCE).tolist():
+            start = self.source_cost(i)
+            self.sources[i] = start
+            self.dist[i] = start
+            self.owner[i] = i
+            heap.append((start, i))
+        heapq.heapify(heap)
+        self.relax(heap)
+
+    def sync_sources(self, cells):
+        """Brings the sources in line with the board at ``cells``, the (row, col) cells whose resources changed."""
+        kind = self.state.board.kind
+        size = self.size
+        added, removed = [], set()
+        for row, col in cells:
+            i = row * size + col
+            present = bool(kind[row, col] & RESOURCE)
+            if i in self.sources and (not present or self.sources[i] != self.source_cost(i)):
+                # A resource replaced in place may be worth less, so it leaves and comes back
+                del self.sources[i]
+                removed.add(i)
+            if present and i not in self.sources:
+                added.append(i)
+        if removed:
+            self.remove_sources(removed)
+        for i in added:
+            self.add_source(i)
+
+    def add_source(self, i):
+        start = self.source_cost(i)
+        self.sources[i] = start
+        if start < self.dist[i]:
+            self.dist[i] = start
+            self.owner[i] = i
+            self.relax([(start, i)])
+
+    def remove_sources(self, removed):
+        dist, owner, cost = self.dist, self.owner, self.cost
+        # Cells routed to a removed resource form trees rooted at it
+        region = []
+        stack = list(removed)
+        seen = set(removed)
+        while stack:
+            i = stack.pop()
+            region.append(i)
+            for n in self.neighbors(i):
+                if n not in seen and owner[n] in removed:
+                    seen.add(n)
+                    stack.append(n)
+        for i in region:
+            # A surviving resource can sit inside the region if a removed one outbid it
+            if i in self.sources:
+                dist[i] = self.sources[i]
+                owner[i] = i
+            else:
+                dist[i] = math.inf
+                owner[i] = -1
+        heap = []
+        for i in region:
+            for n in self.neighbors(i):
+                candidate = dist[n] + cost[i]
+                if candidate < dist[i]:
+                    dist[i] = candidate
+                    owner[i] = owner[n]
+            if dist[i] < math.inf:
+                heap.append((dist[i], i))
+        heapq.heapify(heap)
+        self.relax(heap)
+
+    def relax(self, heap):
+        dist, owner, cost = self.dist, self.owner, self.cost
+        neighbors = self.neighbors
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d > dist[i]:
+                continue
+            for n in neighbors(i):
+                candidate = d + cost[n]
+                if candidate < dist[n]:
+                    dist[n] = candidate
+                    owner[n] = owner[i]
+                    heapq.heappush(heap, (candidate, n))
+
+    def route(self, pos, avoid, limit=ROUTE_SEARCH_LIMIT):
+        """
+        Flat cells of the cheapest walk from ``pos`` to a resource not in ``avoid``,
+        scored like the field, excluding ``pos`` itself. Empty when ``pos`` is such a
+        resource or none turns up within ``limit`` settled cells.
+        """
+        row, col = Board.cell_of(pos)
+        start = row * self.size + col
+        sources, cost = self.sources, self.cost
+        # No resource beats its start cost, so the search ends once that cannot win
+        bonus = min(sources.values(), default=0.0)
+        walked = {start: 0.0}
+        parent = {start: -1}
+        heap = [(0.0, start)]
+        best, best_cell = math.inf, -1
+        settled = 0
+        while heap and settled < limit:
+            d, i = heapq.heappop(heap)
+            if d > walked[i]:
+                continue
+            if d + bonus >= best:
+                break
+            settled += 1
+            if i in sources and i not in avoid and d + sources[i] < best:
+                best, best_cell = d + sources[i], i
+            for n in self.neighbors(i):
+                candidate = d + cost[n]
+                if candidate < walked.get(n, math.inf):
+                    walked[n] = candidate
+                    parent[n] = i
+                    heapq.heappush(heap, (candidate, n))
+        path = []
+        while best_cell not in (start, -1):
+            path.append(best_cell)
+            best_cell = parent[best_cell]
+        path.reverse()
+        return path
+
+    def direction_to(self, pos, i):
+        """The direction from ``pos`` to the adjacent flat cell ``i``, or None if it is not adjacent."""
+        row, col = Board.cell_of(pos)
+        target_row, target_col = divmod(i, self.size)
+        for direction, (dx, dy) in DIRECTIONS.items():
+            if (row + dy, col + dx) == (target_row, target_col):
+                return direction
+        return None
+
+    def step_toward_resource(self, pos):
+        """The direction that leads ``pos`` ([x, y]) downhill, or None when already there."""
+        row, col = Board.cell_of(pos)
+        best, best_direction = self.dist[row * self.size + col], None
+        for direction, (dx, dy) in DIRECTIONS.items():
+            r, c = row + dy, col + dx
+            if 0 <= r < self.size and 0 <= c < self.size and self.dist[r * self.size + c] < best:
+                best, best_direction = self.dist[r * self.size + c], direction
+        return best_direction
+
+
+class Bot:
+    """
+    Plays one seat: walks the distance field, builds until it owns ``max_buildings``
+    of a type, then saves Gold for upgrades in ``upgrade_priority`` order.
+
+    ``target`` is the resource cell it is heading for (-1 for none). When another bot
+    has claimed that resource it keeps a ``route`` to the best unclaimed one and walks
+    it until it arrives, the route's resource goes or gets claimed, or the field's own
+    choice is free again.
+    """
+
+    def __init__(self, player_id, field, max_buildings=3, upgrade_priority=UPGRADE_PRIORITY):
+        self.player_id = player_id
+        self.field = field
+        self.max_buildings = max_buildings
+        self.upgrade_priority = upgrade_priority
+        self.target = -1
+        self.route = []
+        # (cell, claims, board revision) of the last search that found no route
+        self.no_route = None
+
+    def claim_cost(self, state):
+        """Cost of reaching the resource the field leads this bot to; nearer bots claim first."""
+        row, col = Board.cell_of(state.player(self.player_id).pos)
+        return self.field.dist[row * self.field.size + col]
+
+    def step(self, state, claimed):
+        """The direction to move this tick, avoiding resources in ``claimed``; sets ``target``."""
+        field = self.field
+        pos = state.player(self.player_id).pos
+        row, col = Board.cell_of(pos)
+        i = row * field.size + col
+        self.target = field.owner[i]
+        if self.target not in claimed:
+            self.route = []
+            return field.step_toward_resource(pos)
+        if self.route and self.route[0] == i:
+            self.route.pop(0)
+        if not self.route or self.route[-1] not in field.sources or self.route[-1] in claimed \
+                or field.direction_to(pos, self.route[0]) is None:
+            search = (i, frozenset(claimed), state.board.revision)
+            self.route = field.route(pos, claimed) if search != self.no_route else []
+            self.no_route = None if self.route else search
+        if not self.route:
+            # Nothing else within reach. Racing the nearer claimant could at best tie,
+            # and ties go to whoever collects first, so wait for the next spawn instead
+            self.target = -1
+            return None
+        self.target = self.route[-1]
+        return field.direction_to(pos, self.route[0])
+
+    def decide(self, state, claimed=()):
+        """
+        This tick's ``(direction, actions)`` input, heading for a resource outside
+        ``claimed`` (flat cells other bots are going for); call ``field.update()`` first.
+        """
+        player = state.player(self.player_id)
+        resources = player.resources
+        actions = []
+        cell = Board.cell_of(player.pos)
+        if cell not in state.buildings and cell not in state.resources and cell not in state.obstacles:
+            owned = state.board.production.get(self.player_id, {})
+            for building_type, price in BUILDING_COSTS.items():
+                if owned.get(building_type, 0) < self.max_buildings and resources[price["resource"]] >= price["cost"]:
+                    actions.append(("build", building_type))
+                    break
+        if not actions:
+            upgrades = player.upgrades.upgrades
+            for name in self.upgrade_priority:
+                upgrade = upgrades[name]
+                if upgrade.current_level < upgrade.max_level and resources["Gold"] >= upgrade.get_current_cost():
+                    actions.append(("upgrade", name))
+                    break
+        return self.step(state, claimed), actions
+
+
+def bot_inputs(state, field, bots, inputs=None):
+    """Adds every bot's input for this tick to ``inputs`` (a GameState.step mapping)."""
+    inputs = {} if inputs is None else inputs
+    field.update()
+    # The bot closest to its resource claims it first; on a tie the trailing player
+    # does, so neither seat wins every race for the same cell
+    order = sorted(bots, key=lambda bot: (bot.claim_cost(state), state.player(bot.player_id).resources["Points"]))
+    claimed = set()
+    for bot in order:
+        inputs[bot.player_id] = bot.decide(state, claimed)
+        if bot.target >= 0:
+            claimed.add(bot.target)
+    return inputs
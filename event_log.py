@@ -0,0 +1,76 @@
+import json
+import queue
+import threading
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning"}
+
+
+class EventLog:
+    """
+    Structured game events (collect, build, produce, penalty, spawn, ...) kept in a
+    fixed-size ring buffer.
+
+    Records below ``level`` are dropped before anything is built. Callers guard each
+    call with ``enabled(level)``, so a disabled record costs one comparison and never
+    builds its keyword fields. With ``path`` set, a background thread appends every
+    record to a JSONL file so the game thread never waits on disk or terminal I/O.
+    """
+
+    def __init__(self, level=OFF, capacity=1024, path=None):
+        self.level = level
+        self.records = deque(maxlen=capacity)
+        self.path = path
+        self.pending = None
+        self.writer = None
+        if path is not None:
+            self.pending = queue.SimpleQueue()
+            self.writer = threading.Thread(target=self.write_loop, name="event-log-writer", daemon=True)
+            self.writer.start()
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, time, kind, **fields):
+        if level < self.level:
+            return
+        record = (time, level, kind, fields)
+        self.records.append(record)
+        if self.pending is not None:
+            self.pending.put(record)
+
+    def recent(self, count):
+        return list(self.records)[-count:]
+
+    def write_loop(self):
+        with open(self.path, "a") as f:
+            while True:
+                record = self.pending.get()
+                if record is None:
+                    break
+                f.write(json.dumps(to_dict(record)) + "\n")
+                # Only flush once the queue has drained so bursts are written together
+                if self.pending.empty():
+                    f.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.pending.put(None)
+            self.writer.join()
+            self.writer = None
+
+
+def to_dict(record):
+    time, level, kind, fields = record
+    return {"time": round(time, 3), "level": LEVEL_NAMES.get(level, level), "kind": kind, **fields}
+
+
+def format_record(record):
+    time, _, kind, fields = record
+    details = " ".join(f"{key}={value}" for key, value in fields.items())
+    return f"{time:7.1f} {kind} {details}"
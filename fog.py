@@ -0,0 +1,81 @@
+"""
+Per-player visibility for fog of war.
+
+A player sees the disc of cells within their vision radius (VISION_RADIUS plus the
+vision_radius upgrade level). Discs are precomputed once per radius as boolean
+offset masks and stamped into one visibility grid per player, so an update costs
+O(radius²) and happens only when a player changes cell or buys a vision upgrade,
+never per frame or per board cell.
+"""
+import numpy as np
+
+from board import Board
+
+# Vision radius -> boolean (2r+1) x (2r+1) disc
+MASKS = {}
+
+
+def vision_mask(radius):
+    """Cells within ``radius`` of the center, rounded so the disc edge is not spiky."""
+    mask = MASKS.get(radius)
+    if mask is None:
+        offsets = np.arange(-radius, radius + 1)
+        mask = offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius * radius + radius
+        MASKS[radius] = mask
+    return mask
+
+
+def clip(view, size):
+    """Board slices covered by ``view`` and the matching slices of its mask."""
+    row, col, radius = view
+    top, left = max(0, row - radius), max(0, col - radius)
+    bottom, right = min(size, row + radius + 1), min(size, col + radius + 1)
+    board_window = (slice(top, bottom), slice(left, right))
+    mask_window = (slice(top - row + radius, bottom - row + radius), slice(left - col + radius, right - col + radius))
+    return board_window, mask_window
+
+
+class Visibility:
+    """
+    Which cells each player can see in a match.
+
+    ``views[i]`` is player i+1's (row, col, radius) and ``visible[i]`` their boolean
+    grid. ``update`` restamps only players whose view changed, so renderers can key
+    cached fog on ``views``. A different state or a new board generation (reset,
+    snapshot load) starts over.
+    """
+
+    def __init__(self):
+        self.state = None
+        self.generation = None
+        self.views = []
+        self.visible = []
+
+    def update(self, state):
+        """Brings the grids in line with ``state``; returns True if any player's view changed."""
+        if state is not self.state or state.generation != self.generation or not self.visible:
+            self.state = state
+            self.generation = state.generation
+            size = state.board.size
+            self.views = [None] * len(state.players)
+            self.visible = [np.zeros((size, size), dtype=bool) for _ in state.players]
+        changed = False
+        size = state.board.size
+        for index, player in enumerate(state.players):
+            view = Board.cell_of(player.pos) + (player.vision_radius(),)
+            previous = self.views[index]
+            if view == previous:
+                continue
+            grid = self.visible[index]
+            if previous is not None:
+                board_window, _ = clip(previous, size)
+                grid[board_window] = False
+            board_window, mask_window = clip(view, size)
+            grid[board_window] = vision_mask(view[2])[mask_window]
+            self.views[index] = view
+            changed = True
+        return changed
+
+    def is_visible(self, viewers, row, col):
+        """Whether any player id in ``viewers`` can see cell (row, col)."""
+        return any(self.visible[player_id - 1][row, col] for player_id in viewers)
@@ -0,0 +1,182 @@
+import json
+import os
+import queue
+import struct
+import threading
+
+# Fixed-size match records: winner, blue points, red points. Record n lives at
+# n * RECORD.size, so any page is one seek and one read.
+RECORD = struct.Struct("<Bdd")
+# Index file: record count, blue wins, red wins, draws, blue points total, red points total
+INDEX = struct.Struct("<IIIIdd")
+WINNERS = ["Blue", "Red", "Draw"]
+
+
+class ScoreHistory:
+    """
+    Append-only log of match results with running aggregates.
+
+    ``append`` updates the count and aggregates in memory and hands the record to a
+    background thread, which appends it to ``log_path`` and rewrites the small index
+    file, so recording a result is O(1) and never blocks the caller on disk. Pages
+    are read straight from the log. If the index is missing or out of step with the
+    log (e.g. after a crash between the two writes), it is rebuilt from the log once.
+    """
+
+    def __init__(self, log_path, index_path, legacy_path=None):
+        self.log_path = log_path
+        self.index_path = index_path
+        self.lock = threading.Lock()
+        # Records appended but not yet written, by record number
+        self.unwritten = {}
+        self.written = 0
+        self.count = 0
+        self.wins = dict.fromkeys(WINNERS, 0)
+        self.points = {"Blue": 0.0, "Red": 0.0}
+        # Index file contents: the same aggregates over written records only
+        self.saved = None
+        if legacy_path is not None and not os.path.exists(log_path):
+            self.import_json(legacy_path)
+        self.open_index()
+        self.pending = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self.write_loop, name="score-history-writer", daemon=True)
+        self.writer.start()
+
+    def __len__(self):
+        return self.count
+
+    def open_index(self):
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except OSError:
+            log_size = 0
+        records = log_size // RECORD.size
+        if log_size % RECORD.size:
+            # Drop a record torn by a crash mid-write so later appends stay aligned
+            with open(self.log_path, "r+b") as f:
+                f.truncate(records * RECORD.size)
+        try:
+            with open(self.index_path, "rb") as f:
+                count, blue_wins, red_wins, draws, blue_points, red_points = INDEX.unpack(f.read())
+        except (OSError, struct.error):
+            count = -1
+        if count == records:
+            self.saved = [count, blue_wins, red_wins, draws, blue_points, red_points]
+        else:
+            self.rebuild(records)
+        self.count, blue_wins, red_wins, draws, blue_points, red_points = self.saved
+        self.wins = {"Blue": blue_wins, "Red": red_wins, "Draw": draws}
+        self.points = {"Blue": blue_points, "Red": red_points}
+        self.written = self.count
+
+    def rebuild(self, records):
+        self.saved = [0, 0, 0, 0, 0.0, 0.0]
+        for record in self.read_records(0, records):
+            self.add_to_saved(record)
+        try:
+            self.write_index()
+        except OSError as e:
+            print(f"Error saving score history index: {e}")
+
+    def import_json(self, legacy_path):
+        """One-time import of the old score_history.json list."""
+        try:
+            with open(legacy_path) as f:
+                games = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        with open(self.log_path, "ab") as f:
+            for game in games:
+                f.write(RECORD.pack(WINNERS.index(game["winner"]), game["blue_points"], game["red_points"]))
+
+    def add_to_saved(self, record):
+        winner, blue_points, red_points = record
+        saved = self.saved
+        saved[0] += 1
+        saved[1 + WINNERS.index(winner)] += 1
+        saved[4] += blue_points
+        saved[5] += red_points
+
+    def add_to_totals(self, record):
+        winner, blue_points, red_points = record
+        self.count += 1
+        self.wins[winner] += 1
+        self.points["Blue"] += blue_points
+        self.points["Red"] += red_points
+
+    def append(self, winner, blue_points, red_points):
+        record = (winner, blue_points, red_points)
+        with self.lock:
+            self.unwritten[self.count] = record
+            self.add_to_totals(record)
+        self.pending.put(True)
+
+    def average_points(self):
+        if not self.count:
+            return {"Blue": 0.0, "Red": 0.0}
+        return {player: total / self.count for player, total in self.points.items()}
+
+    def page(self, number, size):
+        """Records on page ``number`` (0 = newest) as (record number, record), newest first."""
+        end = self.count - number * size
+        start = max(0, end - size)
+        if end <= 0:
+            return []
+        with self.lock:
+            written = self.written
+            unwritten = dict(self.unwritten)
+        records = list(zip(range(start, min(end, written)), self.read_records(start, min(end, written) - start)))
+        records += [(n, unwritten[n]) for n in range(max(start, written), end)]
+        return records[::-1]
+
+    def read_records(self, start, count):
+        if count <= 0:
+            return []
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(start * RECORD.size)
+                data = f.read(count * RECORD.size)
+        except OSError as e:
+            print(f"Error reading score history: {e}")
+            return []
+        return [(WINNERS[winner], blue, red) for winner, blue, red in RECORD.iter_unpack(data[:len(data) // RECORD.size * RECORD.size])]
+
+    def write_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX.pack(*self.saved))
+        os.replace(tmp_path, self.index_path)
+
+    def write_unwritten(self):
+        # Records are written strictly in order; one that fails stays queued and is
+        # retried after the next append
+        while True:
+            with self.lock:
+                record = self.unwritten.get(self.written)
+            if record is None:
+                return
+            winner, blue_points, red_points = record
+            try:
+                with open(self.log_path, "ab") as f:
+                    f.write(RECORD.pack(WINNERS.index(winner), blue_points, red_points))
+            except OSError as e:
+                print(f"Error saving score history: {e}")
+                return
+            with self.lock:
+                del self.unwritten[self.written]
+                self.written += 1
+            self.add_to_saved(record)
+            try:
+                self.write_index()
+            except OSError as e:
+                print(f"Error saving score history index: {e}")
+
+    def write_loop(self):
+        while self.pending.get() is not None:
+            self.write_unwritten()
+
+    def close(self):
+        if self.writer is not None:
+            self.pending.put(None)
+            self.writer.join()
+            self.writer = None
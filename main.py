@@ -1,23 +1,46 @@
 import pygame
 import os
-import random
-import time
-import json
+import argparse
 import math
+import numpy as np
+from collections import OrderedDict
+from simulation import GameState, GRID_SIZE
+from board import RESOURCE, BUILDING, OBSTACLE
+from event_log import EventLog, INFO, format_record
+from particles import ParticleSystem
+from assets import AssetManager, AssetSpec
+from sound import SoundService
+from profiler import FrameProfiler
+from replay import Recording
+import snapshot
+from history import ScoreHistory
+from network import GameClient, ANY_SEAT, DEFAULT_PORT
+from bot import DistanceField, Bot, bot_inputs
+from fog import Visibility, vision_mask
 # Initialize Pygame
 pygame.init()
 pygame.mixer.init()
 
 # Constants (unchanged)
-GRID_SIZE = 10
 TILE_SIZE = 60
+# The window shows at most VIEW_TILES x VIEW_TILES tiles; larger boards scroll
+VIEW_TILES = min(GRID_SIZE, 10)
+BOARD_WIDTH = VIEW_TILES * TILE_SIZE
+# "shared": one camera for both players, "split": one half-width camera per player
+CAMERA_MODE = "shared"
+# Dim the cells no viewer of a camera can see and hide the other player there
+FOG_OF_WAR = True
+FOG_COLOR = (10, 10, 25)
+FOG_ALPHA = 210
+# Frames drawn per second at most. Game rules advance in fixed 1/TICK_RATE steps
+# whatever the frame rate; after a hitch at most MAX_CATCH_UP_TICKS run in one frame
+# and the rest of the backlog is dropped, so a stall slows the game down briefly
+# instead of freezing it in a spiral of catch-up ticks.
 FPS = 60
-VISION_RADIUS = 2
+TICK_RATE = 60
+MAX_CATCH_UP_TICKS = 5
 UI_WIDTH = 250
-MOVE_DELAY = 10
-RESOURCE_GENERATION_INTERVAL = 5
-GOLD_GENERATION_AMOUNT = 1
-WOOD_GENERATION_AMOUNT = 1
+TEXT_CACHE_SIZE = 256
 
 # Colors (unchanged)
 WHITE = (255, 255, 255)
@@ -31,316 +54,150 @@ HOVER_COLOR = (180, 180, 255)
 GOLD_COLOR = (255, 215, 0)
 WOOD_COLOR = (139, 69, 19)
 
-# Global sprite variables (unchanged)
-stone_sprite = None
-bomb_sprite = None
-spike_sprite = None
-
-# Score history file path (unchanged)
+# Present only the changed regions of the playing screen instead of flipping the
+# whole window every frame. Other screens always flip.
+DIRTY_RECT_RENDERING = False
+
+# Game events below this level are discarded (event_log.OFF disables logging). Set
+# EVENT_LOG_FILE to also stream them to a JSONL file; L toggles the in-game overlay.
+EVENT_LOG_LEVEL = INFO
+EVENT_LOG_FILE = None
+EVENT_OVERLAY_LINES = 8
+
+# Per-phase frame timings over the last PROFILE_WINDOW frames; P toggles the overlay.
+# Set PROFILE_CSV_FILE to also write every frame's timings to a CSV file.
+PROFILE_WINDOW = 300
+PROFILE_CSV_FILE = None
+PROFILE_OVERLAY_REFRESH = 15
+PROFILE_PHASES = ["events", "simulation", "draw_grid", "draw_units", "draw_ui", "particles", "draw_screen", "overlay", "sound", "present", "tick"]
+
+# Every match is recorded to REPLAY_DIR as match-<seed>.rtsr; replay one with
+# `python main.py --replay <file> [--speed N]` or headlessly with `python replay.py <file>`
+RECORD_MATCHES = True
+REPLAY_DIR = os.path.join(os.path.dirname(__file__), "replays")
+
+# F5 saves the match in progress to QUICKSAVE_FILE, F9 restores it
+QUICKSAVE_FILE = os.path.join(os.path.dirname(__file__), "quicksave.rtss")
+
+# Match results are appended to SCORE_LOG_FILE with running totals in SCORE_INDEX_FILE.
+# SCORE_FILE is the old JSON history, imported once if no log exists yet.
 SCORE_FILE = os.path.join(os.path.dirname(__file__), "score_history.json")
+SCORE_LOG_FILE = os.path.join(os.path.dirname(__file__), "score_history.log")
+SCORE_INDEX_FILE = os.path.join(os.path.dirname(__file__), "score_history.idx")
+HISTORY_PAGE_SIZE = 5
 
 # Global variables
-score_history = []
-MAX_HISTORY = 5
-particles = []
+AMBIENT_PARTICLE_COUNT = 50
 dialogue_active = False
 dialogue_alpha = 255
 DIALOGUE_FADE_SPEED = 2
 modes = ["Easy", "Medium", "Hard"]
-selected_mode = None
-obstacles = {}
-OBSTACLE_TYPES = ["Stone", "Bomb", "Spike"]
-
-# New constants for obstacle penalties
-BASE_PENALTIES = {
-    "Stone": {"initial": 10, "continuous": 5},  # Base points deducted
-    "Bomb": {"initial": 20, "continuous": 10},
-    "Spike": {"initial": 30, "continuous": 15}
-}
-MODE_MULTIPLIERS = {"Easy": 0.5, "Medium": 1.0, "Hard": 1.5}  # Difficulty multipliers
-OBSTACLE_CHECK_INTERVAL = 2.0  # Deduct points every 2 seconds
-
-# New global variables to track obstacle contact time
-player1_last_obstacle_deduction = 0
-player2_last_obstacle_deduction = 0
-player1_on_obstacle = False
-player2_on_obstacle = False
 
-def load_score_history():
-    global score_history
-    try:
-        with open(SCORE_FILE, 'r') as f:
-            score_history = json.load(f)
-            if len(score_history) > MAX_HISTORY:
-                score_history = score_history[-MAX_HISTORY:]
-    except (FileNotFoundError, json.JSONDecodeError):
-        score_history = []
-
-load_score_history()
+score_store = ScoreHistory(SCORE_LOG_FILE, SCORE_INDEX_FILE, legacy_path=SCORE_FILE)
+history_page = 0
 
 ASSET_DIR = os.path.join(os.path.dirname(__file__), "assets")
 SOUND_DIR = os.path.join(ASSET_DIR, "sounds")
+ASSET_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".asset_cache")
 
 
 def setup_screen():
-    global screen, WIDTH, HEIGHT, background_image, ui_background_image, game_finish_background
-    WIDTH = GRID_SIZE * TILE_SIZE + UI_WIDTH
-    HEIGHT = GRID_SIZE * TILE_SIZE
+    global screen, WIDTH, HEIGHT
+    WIDTH = BOARD_WIDTH + UI_WIDTH
+    HEIGHT = VIEW_TILES * TILE_SIZE
     screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
     pygame.display.set_caption("Two Player RTS Game")
     print(f"Screen initialized with size: {WIDTH}x{HEIGHT}")
-
-    try:
-        background_image = pygame.image.load(os.path.join(ASSET_DIR, "default_background.png")).convert()
-        background_image = pygame.transform.smoothscale(background_image, (WIDTH, HEIGHT))
-        print("Background image loaded successfully")
-    except pygame.error as e:
-        print(f"Error loading background image: {e}")
-        background_image = pygame.Surface((WIDTH, HEIGHT))
-        background_image.fill(BLACK)
-        print("Using fallback black background")
-
-    try:
-        ui_background_image = pygame.image.load(os.path.join(ASSET_DIR, "new_ui_background1.png")).convert()
-        ui_background_image = pygame.transform.smoothscale(ui_background_image, (UI_WIDTH, HEIGHT))
-        print("UI background image loaded successfully")
-    except pygame.error as e:
-        print(f"Error loading UI background image: {e}")
-        ui_background_image = pygame.Surface((UI_WIDTH, HEIGHT))
-        ui_background_image.fill(LIGHT_GRAY)
-        print("Using fallback light gray UI background")
-
-    try:
-        game_finish_background = pygame.image.load(os.path.join(ASSET_DIR, "game_finish_background.png")).convert()
-        game_finish_background = pygame.transform.smoothscale(game_finish_background, (WIDTH, HEIGHT))
-        print("Game finish background image loaded successfully")
-    except pygame.error as e:
-        print(f"Error loading game finish background image: {e}")
-        game_finish_background = pygame.Surface((WIDTH, HEIGHT))
-        game_finish_background.fill(BLACK)
-        print("Using fallback black game finish background")
-
     return screen
 
 screen = setup_screen()
 
+TILE = (TILE_SIZE, TILE_SIZE)
+BUTTON = (100, 50)
+
+# Every image the game draws, decoded in parallel and cached pre-scaled on disk
+ASSET_MANIFEST = {
+    "background": AssetSpec("default_background.png", (WIDTH, HEIGHT), alpha=False, smooth=True, fallback=BLACK),
+    "ui_background": AssetSpec("new_ui_background1.png", (UI_WIDTH, HEIGHT), alpha=False, smooth=True, fallback=LIGHT_GRAY),
+    "game_finish_background": AssetSpec("game_finish_background.png", (WIDTH, HEIGHT), alpha=False, smooth=True, fallback=BLACK),
+    "stone": AssetSpec("stone.png", TILE, fallback=(100, 100, 100)),
+    "bomb": AssetSpec("bomb.png", TILE, fallback=(255, 0, 0)),
+    "spike": AssetSpec("spike.png", TILE, fallback=(150, 0, 150)),
+    "player1": AssetSpec("player1.png", TILE, fallback=BLUE),
+    "player2": AssetSpec("player2.png", TILE, fallback=RED),
+    "gold_mine": AssetSpec("gold_mine.png", TILE, fallback=GOLD_COLOR),
+    "lumber_mill": AssetSpec("lumber_mill.png", TILE, fallback=WOOD_COLOR),
+    "gold": AssetSpec("gold.png", TILE, fallback=GOLD_COLOR),
+    "wood": AssetSpec("wood.png", TILE, fallback=WOOD_COLOR),
+    "grid": AssetSpec("ground_tile1.png", TILE, alpha=False, fallback=GRAY),
+    "game_rule_button": AssetSpec("generic_button.png", BUTTON, smooth=True, fallback=GRAY),
+    "generic_button": AssetSpec("generic_button.png", BUTTON, fallback=GRAY),
+    "timer_30s": AssetSpec("timer_30s.png", BUTTON, fallback=(100, 100, 200)),
+    "timer_60s": AssetSpec("timer_60s.png", BUTTON, fallback=(100, 200, 100)),
+    "timer_90s": AssetSpec("timer_90s.png", BUTTON, fallback=(200, 100, 100)),
+    "start_button": AssetSpec("start_icon.png", BUTTON, fallback=GRAY),
+    "close_button": AssetSpec("close_icon.png", BUTTON, fallback=GRAY),
+    "replay_button": AssetSpec("replay_icon.png", BUTTON, fallback=GRAY),
+    "history_button": AssetSpec("history_icon.png", (50, 50), fallback=GRAY)
+}
 
-
-# Load obstacle sprites
-try:
-    stone_sprite = pygame.image.load(os.path.join(ASSET_DIR, "stone.png")).convert_alpha()
-    stone_sprite = pygame.transform.scale(stone_sprite, (TILE_SIZE, TILE_SIZE))
-    bomb_sprite = pygame.image.load(os.path.join(ASSET_DIR, "bomb.png")).convert_alpha()
-    bomb_sprite = pygame.transform.scale(bomb_sprite, (TILE_SIZE, TILE_SIZE))
-    spike_sprite = pygame.image.load(os.path.join(ASSET_DIR, "spike.png")).convert_alpha()
-    spike_sprite = pygame.transform.scale(spike_sprite, (TILE_SIZE, TILE_SIZE))
-except pygame.error as e:
-    print(f"Error loading obstacle sprites: {e}")
-    stone_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    stone_sprite.fill((100, 100, 100))
-    bomb_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    bomb_sprite.fill((255, 0, 0))
-    spike_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    spike_sprite.fill((150, 0, 150))
+asset_manager = AssetManager(ASSET_DIR, ASSET_CACHE_DIR)
+images = asset_manager.load(ASSET_MANIFEST)
+
+background_image = images["background"]
+ui_background_image = images["ui_background"]
+game_finish_background = images["game_finish_background"]
+stone_sprite = images["stone"]
+bomb_sprite = images["bomb"]
+spike_sprite = images["spike"]
+player1_sprite = images["player1"]
+player2_sprite = images["player2"]
+gold_mine_sprite = images["gold_mine"]
+lumber_mill_sprite = images["lumber_mill"]
+gold_sprite = images["gold"]
+wood_sprite = images["wood"]
+grid_texture = images["grid"]
+game_rule_button_image = images["game_rule_button"]
+generic_button_image = images["generic_button"]
+timer_30s_image = images["timer_30s"]
+timer_60s_image = images["timer_60s"]
+timer_90s_image = images["timer_90s"]
+start_button_image = images["start_button"]
+close_button_image = images["close_button"]
+replay_button_image = images["replay_button"]
+history_button_image = images["history_button"]
 
 # Background Music
 background_music = os.path.join(SOUND_DIR, "background_music.mp3")
 
-# Sound Effects with error handling
-try:
-    resource_collect_sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, "collect.wav"))
-    move_sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, "move.wav"))
-    button_click_sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, "button_click.wav"))
-    game_over_sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, "game_over.wav"))
-    start_game_sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, "start.wav"))
-    build_sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, "build.wav"))
-except pygame.error as e:
-    print(f"Error loading sound: {e}")
-    resource_collect_sound = move_sound = button_click_sound = game_over_sound = start_game_sound = build_sound = pygame.mixer.Sound(pygame.mixer.Sound(buffer=b'\x00' * 1024))
-
-# Set volume
-resource_collect_sound.set_volume(0.7)
-move_sound.set_volume(0.3)
-button_click_sound.set_volume(0.6)
-game_over_sound.set_volume(0.1)
-start_game_sound.set_volume(0.7)
-build_sound.set_volume(0.5)
-
-# Load and scale sprites with error handling
-try:
-    player1_sprite = pygame.image.load(os.path.join(ASSET_DIR, "player1.png")).convert_alpha()
-    player1_sprite = pygame.transform.scale(player1_sprite, (TILE_SIZE, TILE_SIZE))
-except pygame.error as e:
-    print(f"Error loading player1 sprite: {e}")
-    player1_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    player1_sprite.fill(BLUE)
-
-try:
-    player2_sprite = pygame.image.load(os.path.join(ASSET_DIR, "player2.png")).convert_alpha()
-    player2_sprite = pygame.transform.scale(player2_sprite, (TILE_SIZE, TILE_SIZE))
-except pygame.error as e:
-    print(f"Error loading player2 sprite: {e}")
-    player2_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    player2_sprite.fill(RED)
-
-try:
-    background_image = pygame.image.load(os.path.join(ASSET_DIR, "default_background.png")).convert()
-    background_image = pygame.transform.scale(background_image, (screen.get_width(), screen.get_height()))
-except pygame.error as e:
-    print(f"Error loading background image: {e}")
-    background_image = pygame.Surface((screen.get_width(), screen.get_height()))
-    background_image.fill(BLACK)
-
-try:
-    ui_background_image = pygame.image.load(os.path.join(ASSET_DIR, "new_ui_background1.png")).convert()
-    ui_background_image = pygame.transform.scale(ui_background_image, (UI_WIDTH, HEIGHT))
-except pygame.error as e:
-    print(f"Error loading UI background image: {e}")
-    ui_background_image = pygame.Surface((UI_WIDTH, HEIGHT))
-    ui_background_image.fill(LIGHT_GRAY)
-
-try:
-    game_finish_background = pygame.image.load(os.path.join(ASSET_DIR, "game_finish_background.png")).convert()
-    game_finish_background = pygame.transform.scale(game_finish_background, (screen.get_width(), screen.get_height()))
-except pygame.error as e:
-    print(f"Error loading game finish background image: {e}")
-    game_finish_background = pygame.Surface((screen.get_width(), screen.get_height()))
-    game_finish_background.fill(BLACK)
-
-try:
-    gold_mine_sprite = pygame.image.load(os.path.join(ASSET_DIR, "gold_mine.png")).convert_alpha()
-    gold_mine_sprite = pygame.transform.scale(gold_mine_sprite, (TILE_SIZE, TILE_SIZE))
-    lumber_mill_sprite = pygame.image.load(os.path.join(ASSET_DIR, "lumber_mill.png")).convert_alpha()
-    lumber_mill_sprite = pygame.transform.scale(lumber_mill_sprite, (TILE_SIZE, TILE_SIZE))
-except pygame.error as e:
-    print(f"Error loading building sprites: {e}")
-    gold_mine_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    gold_mine_sprite.fill(GOLD_COLOR)
-    lumber_mill_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    lumber_mill_sprite.fill(WOOD_COLOR)
-
-try:
-    game_rule_button_image = pygame.image.load(os.path.join(ASSET_DIR, "generic_button.png")).convert_alpha()
-    game_rule_button_image = pygame.transform.smoothscale(game_rule_button_image, (100, 50))
-except pygame.error as e:
-    print(f"Error loading game rule button image: {e}")
-    game_rule_button_image = pygame.Surface((100, 50))
-    game_rule_button_image.fill(GRAY)
-
-def load_resource_sprites():
-    global gold_sprite, wood_sprite
-    try:
-        gold_sprite = pygame.image.load(os.path.join(ASSET_DIR, "gold.png"))
-        gold_sprite = pygame.transform.scale(gold_sprite, (TILE_SIZE, TILE_SIZE))
-        wood_sprite = pygame.image.load(os.path.join(ASSET_DIR, "wood.png"))
-        wood_sprite = pygame.transform.scale(wood_sprite, (TILE_SIZE, TILE_SIZE))
-    except Exception as e:
-        print(f"Error loading resource sprites: {e}")
-        gold_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        gold_sprite.fill(GOLD_COLOR)
-        wood_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        wood_sprite.fill(WOOD_COLOR)
-
-load_resource_sprites()
-
-try:
-    grid_texture = pygame.image.load(os.path.join(ASSET_DIR, "ground_tile1.png")).convert()
-    grid_texture = pygame.transform.scale(grid_texture, (TILE_SIZE, TILE_SIZE))
-except pygame.error as e:
-    print(f"Error loading grid texture: {e}")
-    grid_texture = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    grid_texture.fill(GRAY)
-
-# Load generic button image for mode selection
-try:
-    generic_button_image = pygame.image.load(os.path.join(ASSET_DIR, "generic_button.png")).convert_alpha()
-    generic_button_image = pygame.transform.scale(generic_button_image, (100, 50))  # Ensure 100x50 pixels
-except pygame.error as e:
-    print(f"Error loading generic button image: {e}")
-    generic_button_image = pygame.Surface((100, 50))
-    generic_button_image.fill(GRAY)
-
-# Load timer images
-try:
-    timer_30s_image = pygame.image.load(os.path.join(ASSET_DIR, "timer_30s.png")).convert_alpha()
-    timer_30s_image = pygame.transform.scale(timer_30s_image, (100, 50))
-    timer_60s_image = pygame.image.load(os.path.join(ASSET_DIR, "timer_60s.png")).convert_alpha()
-    timer_60s_image = pygame.transform.scale(timer_60s_image, (100, 50))
-    timer_90s_image = pygame.image.load(os.path.join(ASSET_DIR, "timer_90s.png")).convert_alpha()
-    timer_90s_image = pygame.transform.scale(timer_90s_image, (100, 50))
-except pygame.error as e:
-    print(f"Error loading timer images: {e}")
-    timer_30s_image = pygame.Surface((100, 50))
-    timer_30s_image.fill((100, 100, 200))
-    timer_60s_image = pygame.Surface((100, 50))
-    timer_60s_image.fill((100, 200, 100))
-    timer_90s_image = pygame.Surface((100, 50))
-    timer_90s_image.fill((200, 100, 100))
-
-# Global game state
-# Global game state (unchanged)
+# Reserved mixer channels per sound category
+SOUND_CHANNELS = {"move": 2, "collect": 3, "ui": 2, "game_over": 1}
+
+# Sound effects, decoded on first play: name -> (file, volume, category, priority)
+sounds = SoundService(SOUND_DIR, SOUND_CHANNELS)
+sounds.register("collect", "collect.wav", 0.7, "collect", priority=1)
+sounds.register("build", "build.wav", 0.5, "collect", priority=2)
+sounds.register("move", "move.wav", 0.3, "move")
+sounds.register("button_click", "button_click.wav", 0.6, "ui")
+sounds.register("start_game", "start.wav", 0.7, "ui")
+sounds.register("game_over", "game_over.wav", 0.1, "game_over")
+
 # Global game state (unchanged)
 game_state = {
     "screen": "start",
-    "timer": 0,
-    "start_time": 0,
-    "remaining_time": 0,
-    "game_duration": 0,
-    "last_resource_generation": 0,
-    "last_building_generation": 0,
     "selected_duration": 0,
     "previous_screen": None,
     "selected_mode": None
 }
 
-# Global player positions and resources
-player1_pos = [0, 0]
-player2_pos = [0, 0]
-player1_target = [0, 0]
-player2_target = [0, 0]
-resources = {}
-player1_resources = {"Gold": 0, "Wood": 0, "Points": 0}
-player2_resources = {"Gold": 0, "Wood": 0, "Points": 0}
-buildings = {}
-
-def reset_game():
-    global player1_pos, player2_pos, player1_target, player2_target, resources, player1_resources, player2_resources, buildings, obstacles, selected_mode
-    player1_pos = [random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)]
-    player2_pos = [random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)]
-    player1_target = list(player1_pos)
-    player2_target = list(player2_pos)
-
-    resources = {}
-    player1_resources = {"Gold": 0, "Wood": 0, "Points": 0}
-    player2_resources = {"Gold": 0, "Wood": 0, "Points": 0}
-    buildings = {}
-    obstacles = {}
-
-    for _ in range(5):
-        x, y = random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)
-        resources[(x, y)] = {"type": "Gold", "amount": 1}
-    for _ in range(5):
-        x, y = random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)
-        resources[(x, y)] = {"type": "Wood", "amount": 1}
-
-    selected_mode = game_state["selected_mode"]
-    if selected_mode == "Medium":
-        for _ in range(3):
-            while True:
-                x, y = random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)
-                if (x, y) not in resources and (x, y) not in buildings and [x, y] != player1_pos and [x, y] != player2_pos:
-                    obstacles[(x, y)] = random.choice(OBSTACLE_TYPES)
-                    break
-    elif selected_mode == "Hard":
-        for _ in range(5):
-            while True:
-                x, y = random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)
-                if (x, y) not in resources and (x, y) not in buildings and [x, y] != player1_pos and [x, y] != player2_pos:
-                    obstacles[(x, y)] = random.choice(OBSTACLE_TYPES)
-                    break
-
-    game_state['last_resource_generation'] = time.time()
-    game_state['last_building_generation'] = time.time()
+# Board, players and match timers; see simulation.py
+event_log = EventLog(EVENT_LOG_LEVEL, path=EVENT_LOG_FILE)
+sim = GameState(log=event_log)
+visibility = Visibility()
+show_event_overlay = False
+profiler = FrameProfiler(PROFILE_PHASES, PROFILE_WINDOW, PROFILE_CSV_FILE)
+show_profile_overlay = False
+profile_overlay = None
 
 # Reset button states to initial configuration
 def reset_button_states():
@@ -351,6 +208,44 @@ def reset_button_states():
     close_button.text = " "
     close_button.image = close_button_image  # Keep it defined but don't draw it initially
 
+# Fonts are shared by (name, size); building one is far more expensive than a lookup
+fonts = {}
+
+def get_font(size, name=None):
+    key = (name, size)
+    font = fonts.get(key)
+    if font is None:
+        font = pygame.font.Font(name, size)
+        fonts[key] = font
+    return font
+
+class TextCache:
+    """
+    LRU cache of rendered text surfaces keyed by (font, size, text, color), so glyphs
+    are only rasterized when a displayed string actually changes. Returned surfaces
+    are shared and must not be modified.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def render(self, text, size, color, font_name=None):
+        key = (font_name, size, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = get_font(size, font_name).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+text_cache = TextCache(TEXT_CACHE_SIZE)
+
+def render_text(text, size, color, font_name=None):
+    return text_cache.render(text, size, color, font_name)
+
 class ResponsiveButton:
     def __init__(self, x_ratio, y_ratio, width_ratio, height_ratio, text, image, text_color=WHITE, text_opacity=255):
         self.x_ratio = x_ratio
@@ -365,12 +260,22 @@ class ResponsiveButton:
         self.is_hover = False
         self.rect = None
         self.font = None
+        # Scaled image and rendered label are kept until the size, image or text changes
+        self.scaled_image = None
+        self.scaled_source = None
+        self.text_surface = None
+        self.text_key = None
 
     def render_text(self, screen, font):
-        text_surface = font.render(self.text, True, self.text_color)
-        text_surface.set_alpha(self.text_opacity)
-        text_rect = text_surface.get_rect(center=self.rect.center)  # Center text within the button
-        screen.blit(text_surface, text_rect)
+        if self.text_opacity <= 0:
+            return
+        key = (self.text, self.text_color, self.text_opacity, font)
+        if key != self.text_key:
+            self.text_surface = font.render(self.text, True, self.text_color)
+            self.text_surface.set_alpha(self.text_opacity)
+            self.text_key = key
+        text_rect = self.text_surface.get_rect(center=self.rect.center)  # Center text within the button
+        screen.blit(self.text_surface, text_rect)
 
     def update_rect(self, screen_width, screen_height):
         # Use self. to access instance variables
@@ -378,17 +283,22 @@ class ResponsiveButton:
         y = int(screen_height * self.y_ratio)
         width = int(screen_width * self.width_ratio)
         height = int(screen_height * self.height_ratio)
+        if self.rect is not None and self.rect == (x, y, width, height):
+            return
         self.rect = pygame.Rect(x, y, width, height)
         # Dynamically adjust font size to fit the button height, with a cap
         font_size = min(max(20, int(height * 0.6)), 30)  # Range: 20 to 30 pixels
-        self.font = pygame.font.Font(None, font_size)
+        self.font = get_font(font_size)
 
     def draw(self, surface):
         if not self.rect:
             self.update_rect(surface.get_width(), surface.get_height())
         # Scale image to match the button rect dimensions
-        scaled_image = pygame.transform.scale(self.image, (self.rect.width, self.rect.height))
-        surface.blit(scaled_image, self.rect)
+        if (self.scaled_image is None or self.scaled_source is not self.image
+                or self.scaled_image.get_size() != self.rect.size):
+            self.scaled_image = pygame.transform.scale(self.image, self.rect.size)
+            self.scaled_source = self.image
+        surface.blit(self.scaled_image, self.rect)
         self.render_text(surface, self.font)
 
     def is_clicked(self, pos):
@@ -397,16 +307,6 @@ class ResponsiveButton:
     def handle_hover(self, pos):
         self.is_hover = self.rect and self.rect.collidepoint(pos)
 
-# Load button images
-start_button_image = pygame.image.load(os.path.join(ASSET_DIR, "start_icon.png")).convert_alpha()
-start_button_image = pygame.transform.scale(start_button_image, (100, 50))
-close_button_image = pygame.image.load(os.path.join(ASSET_DIR, "close_icon.png")).convert_alpha()
-close_button_image = pygame.transform.scale(close_button_image, (100, 50))
-replay_button_image = pygame.image.load(os.path.join(ASSET_DIR, "replay_icon.png")).convert_alpha()
-replay_button_image = pygame.transform.scale(replay_button_image, (100, 50))
-history_button_image = pygame.image.load(os.path.join(ASSET_DIR, "history_icon.png")).convert_alpha()
-history_button_image = pygame.transform.scale(history_button_image, (50, 50))
-
 # Initialize buttons (updated game_rule_button position)
 start_button = ResponsiveButton(0.3, 0.7, 0.2, 0.1, " ", start_button_image)
 close_button = ResponsiveButton(0.55, 0.7, 0.2, 0.1, " ", close_button_image)
@@ -417,127 +317,357 @@ timer_buttons = [
 ]
 history_button = ResponsiveButton(0.9, 0.05, 0.08, 0.08, " ", history_button_image)  # Top right
 game_rule_button = ResponsiveButton(0.05, 0.05, 0.08, 0.08, "Game Rules", game_rule_button_image, text_opacity=255, text_color=WHITE)  # Top left
+rule_back_button = ResponsiveButton(0.45, 0.85, 0.1, 0.1, "Back", close_button_image, text_opacity=255, text_color=WHITE)
+history_back_button = ResponsiveButton(0.45, 0.8, 0.1, 0.1, " ", close_button_image)
+history_newer_button = ResponsiveButton(0.19, 0.45, 0.06, 0.08, "<", generic_button_image, text_opacity=255, text_color=WHITE)
+history_older_button = ResponsiveButton(0.75, 0.45, 0.06, 0.08, ">", generic_button_image, text_opacity=255, text_color=WHITE)
+mode_buttons = [
+    ResponsiveButton(0.3, 0.5, 0.15, 0.1, "Easy", generic_button_image, text_opacity=255, text_color=WHITE),
+    ResponsiveButton(0.45, 0.5, 0.15, 0.1, "Medium", generic_button_image, text_opacity=255, text_color=WHITE),
+    ResponsiveButton(0.6, 0.5, 0.15, 0.1, "Hard", generic_button_image, text_opacity=255, text_color=WHITE)
+]
 
-def draw_grid():
-    for x in range(GRID_SIZE):
-        for y in range(GRID_SIZE):
-            screen.blit(grid_texture, (x * TILE_SIZE, y * TILE_SIZE))
-            if (y, x) in resources:
-                resource = resources[(y, x)]
-                resource_sprite = gold_sprite if resource['type'] == 'Gold' else wood_sprite
-                screen.blit(resource_sprite, (x * TILE_SIZE, y * TILE_SIZE))
-            if (y, x) in buildings:
-                building = buildings[(y, x)]
-                building_sprite = gold_mine_sprite if building['type'] == 'Gold Mine' else lumber_mill_sprite
-                screen.blit(building_sprite, (x * TILE_SIZE, y * TILE_SIZE))
-            if (y, x) in obstacles:
-                obstacle_type = obstacles[(y, x)]
-                obstacle_sprite = (
-                    stone_sprite if obstacle_type == "Stone" else
-                    bomb_sprite if obstacle_type == "Bomb" else
-                    spike_sprite
-                )
-                screen.blit(obstacle_sprite, (x * TILE_SIZE, y * TILE_SIZE))
-    
+# Sprites indexed by the type codes stored in the board layers (0 is unused)
+RESOURCE_SPRITES = [None, gold_sprite, wood_sprite]
+BUILDING_SPRITES = [None, gold_mine_sprite, lumber_mill_sprite]
+OBSTACLE_SPRITES = [None, stone_sprite, bomb_sprite, spike_sprite]
+
+def draw_tile(surface, row, col, x, y):
+    board = sim.board
+    surface.blit(grid_texture, (x, y))
+    kind = board.kind[row, col]
+    if kind & RESOURCE:
+        surface.blit(RESOURCE_SPRITES[board.resource_type[row, col]], (x, y))
+    if kind & BUILDING:
+        surface.blit(BUILDING_SPRITES[board.building_type[row, col]], (x, y))
+    if kind & OBSTACLE:
+        surface.blit(OBSTACLE_SPRITES[board.obstacle_type[row, col]], (x, y))
+
+fog_overlays = {}
+
+def fog_overlay(radius):
+    """
+    A (2r+1)-tile square, opaque outside the vision disc of ``radius`` and clear
+    inside it. Blitting it onto fog with BLEND_RGBA_MIN cuts one player's view out.
+    """
+    overlay = fog_overlays.get(radius)
+    if overlay is None:
+        mask = vision_mask(radius)
+        overlay = pygame.Surface((mask.shape[1] * TILE_SIZE, mask.shape[0] * TILE_SIZE), pygame.SRCALPHA)
+        overlay.fill((255, 255, 255, 255))
+        for row, col in zip(*np.nonzero(mask)):
+            overlay.fill((255, 255, 255, 0), (col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+        fog_overlays[radius] = overlay
+    return overlay
+
+class Camera:
+    """
+    A viewport onto the board: a screen rect showing ``rows`` x ``cols`` tiles whose
+    top-left tile (``origin``) keeps ``follow()`` centered, clamped to the board edges.
 
-def draw_units():
-    screen.blit(player1_sprite, (player1_pos[0] * TILE_SIZE, player1_pos[1] * TILE_SIZE))
-    screen.blit(player2_sprite, (player2_pos[0] * TILE_SIZE, player2_pos[1] * TILE_SIZE))
+    The visible tiles are pre-composited into a viewport-sized surface. Only tiles the
+    simulation reports as changed are redrawn, scrolling reuses the overlapping part and
+    draws just the exposed strip, and a new board generation (match reset) rebuilds it.
+    Per-frame cost depends on the viewport size, never on the board size.
 
-# New function to draw the game rule screen
-def draw_game_rule_screen():
-    screen.blit(background_image, (0, 0))
-    title_font = pygame.font.Font(None, int(HEIGHT * 0.1))
-    title = title_font.render("Game Rules", True, WHITE)
-    screen.blit(title, title.get_rect(center=(WIDTH // 2, HEIGHT // 10)))
+    Fog for the players in ``viewers`` lives in a second, alpha surface that is only
+    rebuilt when the camera scrolls or one of their views changes, and tiles and fog are
+    blended into ``fogged`` only after either changed, so a quiet frame stays one blit.
+    """
+    def __init__(self, rect, follow, viewers=(1, 2)):
+        self.rect = rect
+        self.rows = rect.height // TILE_SIZE
+        self.cols = rect.width // TILE_SIZE
+        self.follow = follow
+        self.viewers = viewers
+        self.origin = (0, 0)
+        self.surface = pygame.Surface((self.cols * TILE_SIZE, self.rows * TILE_SIZE)).convert()
+        self.generation = None
+        self.fog = pygame.Surface(self.surface.get_size(), pygame.SRCALPHA)
+        self.fog_key = None
+        self.fogged = self.surface.copy()
+        self.fogged_valid = False
+
+    def target_origin(self):
+        col, row = self.follow()
+        max_row = max(0, sim.grid_size - self.rows)
+        max_col = max(0, sim.grid_size - self.cols)
+        return (min(max(row - self.rows // 2, 0), max_row), min(max(col - self.cols // 2, 0), max_col))
+
+    def is_visible(self, row, col):
+        origin_row, origin_col = self.origin
+        return origin_row <= row < origin_row + self.rows and origin_col <= col < origin_col + self.cols
+
+    def tile_rect(self, row, col):
+        return pygame.Rect(self.rect.x + (col - self.origin[1]) * TILE_SIZE,
+                           self.rect.y + (row - self.origin[0]) * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+
+    def world_offset(self):
+        # Screen position of the board's pixel (0, 0) in this view
+        return (self.rect.x - self.origin[1] * TILE_SIZE, self.rect.y - self.origin[0] * TILE_SIZE)
+
+    def visible_rows(self):
+        return range(self.origin[0], self.origin[0] + self.rows)
+
+    def visible_cols(self):
+        return range(self.origin[1], self.origin[1] + self.cols)
+
+    def redraw(self, rows, cols):
+        self.fogged_valid = False
+        origin_row, origin_col = self.origin
+        for row in rows:
+            for col in cols:
+                x, y = (col - origin_col) * TILE_SIZE, (row - origin_row) * TILE_SIZE
+                if 0 <= row < sim.grid_size and 0 <= col < sim.grid_size:
+                    draw_tile(self.surface, row, col, x, y)
+                else:
+                    self.surface.fill(BLACK, (x, y, TILE_SIZE, TILE_SIZE))
+
+    def update(self, changed_cells):
+        origin = self.target_origin()
+        if self.generation != sim.generation:
+            self.origin = origin
+            self.generation = sim.generation
+            self.redraw(self.visible_rows(), self.visible_cols())
+            presenter.invalidate()
+            return
+        if origin != self.origin:
+            drow, dcol = origin[0] - self.origin[0], origin[1] - self.origin[1]
+            self.origin = origin
+            rows, cols = self.visible_rows(), self.visible_cols()
+            if abs(drow) >= self.rows or abs(dcol) >= self.cols:
+                self.redraw(rows, cols)
+            else:
+                # Keep the overlapping tiles and draw only the newly exposed strips
+                self.surface.scroll(-dcol * TILE_SIZE, -drow * TILE_SIZE)
+                if drow > 0:
+                    self.redraw(rows[-drow:], cols)
+                elif drow < 0:
+                    self.redraw(rows[:-drow], cols)
+                if dcol > 0:
+                    self.redraw(rows, cols[-dcol:])
+                elif dcol < 0:
+                    self.redraw(rows, cols[:-dcol])
+            presenter.add(self.rect)
+        for row, col in changed_cells:
+            if self.is_visible(row, col):
+                self.redraw((row,), (col,))
+                presenter.add(self.tile_rect(row, col))
+
+    def update_fog(self):
+        views = tuple(visibility.views[player_id - 1] for player_id in self.viewers)
+        key = (self.origin, views)
+        if key == self.fog_key:
+            return
+        self.fog_key = key
+        self.fogged_valid = False
+        self.fog.fill(FOG_COLOR + (FOG_ALPHA,))
+        fog_rects = []
+        for row, col, radius in views:
+            overlay = fog_overlay(radius)
+            position = ((col - radius - self.origin[1]) * TILE_SIZE, (row - radius - self.origin[0]) * TILE_SIZE)
+            self.fog.blit(overlay, position, special_flags=pygame.BLEND_RGBA_MIN)
+            fog_rects.append(overlay.get_rect(topleft=position).move(self.rect.topleft).clip(self.rect))
+        # Both the old and the new holes changed on screen
+        presenter.track(self, fog_rects)
+
+    def draw(self, surface):
+        if not FOG_OF_WAR:
+            surface.blit(self.surface, self.rect)
+            return
+        if not self.fogged_valid:
+            self.fogged.blit(self.surface, (0, 0))
+            self.fogged.blit(self.fog, (0, 0))
+            self.fogged_valid = True
+        surface.blit(self.fogged, self.rect)
+
+class DirtyRectPresenter:
+    """
+    Collects the screen regions that changed this frame and presents just those with
+    pygame.display.update. Falls back to a full flip when disabled, off the playing
+    screen, on screen transitions or after invalidate().
+    """
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.rects = []
+        self.tracked = {}
+        self.full_redraw = True
+        self.last_screen = None
+
+    def add(self, rect):
+        self.rects.append(rect)
+
+    def track(self, key, rects):
+        # Regions drawn under ``key`` last frame must be repainted too, so whatever
+        # moved away from them gets erased on screen.
+        self.rects.extend(self.tracked.get(key, ()))
+        self.rects.extend(rects)
+        self.tracked[key] = rects
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def present(self):
+        current_screen = game_state["screen"]
+        if (not self.enabled or self.full_redraw or current_screen != "playing"
+                or current_screen != self.last_screen):
+            pygame.display.flip()
+        elif self.rects:
+            pygame.display.update(self.rects)
+        self.rects = []
+        self.full_redraw = False
+        self.last_screen = current_screen
+
+presenter = DirtyRectPresenter(DIRTY_RECT_RENDERING)
+
+def create_cameras(viewers=(1, 2)):
+    # ``viewers``: whose vision the shared camera shows, e.g. only the human seats
+    if CAMERA_MODE == "split":
+        half = pygame.Rect(0, 0, BOARD_WIDTH // 2 // TILE_SIZE * TILE_SIZE, HEIGHT)
+        return [
+            Camera(half, lambda: sim.players[0].pos, (1,)),
+            Camera(half.move(BOARD_WIDTH - half.width, 0), lambda: sim.players[1].pos, (2,))
+        ]
+    # A shared camera keeps the midpoint between both players centered
+    return [Camera(pygame.Rect(0, 0, BOARD_WIDTH, HEIGHT),
+                   lambda: [(a + b) // 2 for a, b in zip(sim.players[0].pos, sim.players[1].pos)], viewers)]
+
+cameras = create_cameras()
+
+def draw_grid():
+    changed_cells = sim.drain_changed_cells()
+    if FOG_OF_WAR:
+        visibility.update(sim)
+    for camera in cameras:
+        camera.update(changed_cells)
+        if FOG_OF_WAR:
+            camera.update_fog()
+        camera.draw(screen)
+
+def draw_units(position_of=None):
+    # ``position_of(player)`` may return fractional tiles, e.g. for interpolated remote units
+    unit_rects = []
+    for camera in cameras:
+        for player, sprite in zip(sim.players, (player1_sprite, player2_sprite)):
+            col, row = position_of(player) if position_of else player.pos
+            # Under fog of war a unit only shows where one of the camera's viewers can see it
+            if camera.is_visible(row, col) and (not FOG_OF_WAR or visibility.is_visible(camera.viewers, int(row), int(col))):
+                unit_rects.append(screen.blit(sprite, camera.tile_rect(row, col)))
+    presenter.track("units", unit_rects)
+
+def draw_effect_particles():
+    particle_rects = []
+    for camera in cameras:
+        screen.set_clip(camera.rect)
+        particle_rects.extend(effect_particles.draw(screen, camera.world_offset()))
+    screen.set_clip(None)
+    return particle_rects
+
+# Rules text, shown one line per entry in the rules box
+RULES_TEXT = [
+    "Welcome to Two Player RTS Game!",
+    "Objective: Collect resources (Gold and Wood), build structures, and earn points to outscore your opponent within the time limit.",
+    "Controls:",
+    "  - Blue Player (1P):",
+    "    - Move: Arrow Keys",
+    "    - Upgrade Resource Generation: 1",
+    "    - Upgrade Movement Speed: 2",
+    "    - Upgrade Vision Radius: 3",
+    "    - Build Gold Mine: 4",
+    "    - Build Lumber Mill: 5",
+    "  - Red Player (2P):",
+    "    - Move: W, A, S, D",
+    "    - Upgrade Resource Generation: 7",
+    "    - Upgrade Movement Speed: 8",
+    "    - Upgrade Vision Radius: 9",
+    "    - Build Gold Mine: I",
+    "    - Build Lumber Mill: O",
+    "Resources:",
+    "  - Gold: Collected from the map or generated by Gold Mines (50 points each).",
+    "  - Wood: Collected from the map or generated by Lumber Mills (30 points each).",
+    "Buildings:",
+    "  - Gold Mine: Costs 10 Gold, generates 1 Gold every 5 seconds.",
+    "  - Lumber Mill: Costs 10 Wood, generates 1 Wood every 5 seconds.",
+    "Upgrades: Use Gold to improve Resource Generation, Movement Speed, or Vision Radius (max 5, 3, 3 levels).",
+    "Obstacles:",
+    "  - Stone: Initial 10 points loss, 5 points every 2 seconds.",
+    "  - Bomb: Initial 20 points loss, 10 points every 2 seconds.",
+    "  - Spike: Initial 30 points loss, 15 points every 2 seconds.",
+    "  - Penalties scale with difficulty (Easy: 0.5x, Medium: 1x, Hard: 1.5x).",
+    "Winning: The player with the most points when time runs out wins. A draw occurs if points are equal."
+]
 
-    # Define the rules text
-    rules_font = pygame.font.Font(None, int(HEIGHT * 0.03))
-    rules_text = [
-        "Welcome to Two Player RTS Game!",
-        "Objective: Collect resources (Gold and Wood), build structures, and earn points to outscore your opponent within the time limit.",
-        "Controls:",
-        "  - Blue Player (1P):",
-        "    - Move: Arrow Keys",
-        "    - Upgrade Resource Generation: 1",
-        "    - Upgrade Movement Speed: 2",
-        "    - Upgrade Vision Radius: 3",
-        "    - Build Gold Mine: 4",
-        "    - Build Lumber Mill: 5",
-        "  - Red Player (2P):",
-        "    - Move: W, A, S, D",
-        "    - Upgrade Resource Generation: 7",
-        "    - Upgrade Movement Speed: 8",
-        "    - Upgrade Vision Radius: 9",
-        "    - Build Gold Mine: I",
-        "    - Build Lumber Mill: O",
-        "Resources:",
-        "  - Gold: Collected from the map or generated by Gold Mines (50 points each).",
-        "  - Wood: Collected from the map or generated by Lumber Mills (30 points each).",
-        "Buildings:",
-        "  - Gold Mine: Costs 10 Gold, generates 1 Gold every 5 seconds.",
-        "  - Lumber Mill: Costs 10 Wood, generates 1 Wood every 5 seconds.",
-        "Upgrades: Use Gold to improve Resource Generation, Movement Speed, or Vision Radius (max 5, 3, 3 levels).",
-        "Obstacles:",
-        "  - Stone: Initial 10 points loss, 5 points every 2 seconds.",
-        "  - Bomb: Initial 20 points loss, 10 points every 2 seconds.",
-        "  - Spike: Initial 30 points loss, 15 points every 2 seconds.",
-        "  - Penalties scale with difficulty (Easy: 0.5x, Medium: 1x, Hard: 1.5x).",
-        "Winning: The player with the most points when time runs out wins. A draw occurs if points are equal."
-    ]
+# The rules box never changes, so it is composed once per window size
+rule_box = None
 
-    # Draw rules text in a scrollable box
-    box_width = WIDTH - 100
-    box_height = HEIGHT - 150
-    box_x = (WIDTH - box_width) // 2
-    box_y = HEIGHT // 5
-    rule_box = pygame.Surface((box_width, box_height), pygame.SRCALPHA)
-    rule_box.fill((50, 50, 50, 200))  # Semi-transparent background
-    pygame.draw.rect(rule_box, WHITE, (0, 0, box_width, box_height), 2)  # Border
+def compose_rule_box(width, height):
+    box_width = width - 100
+    box_height = height - 150
+    surface = pygame.Surface((box_width, box_height), pygame.SRCALPHA)
+    surface.fill((50, 50, 50, 200))  # Semi-transparent background
+    pygame.draw.rect(surface, WHITE, (0, 0, box_width, box_height), 2)  # Border
 
+    rules_size = int(height * 0.03)
     y_offset = 20
-    for line in rules_text:
-        text = rules_font.render(line, True, WHITE)
+    for line in RULES_TEXT:
+        text = get_font(rules_size).render(line, True, WHITE)
         if y_offset + text.get_height() <= box_height - 20:
-            rule_box.blit(text, (10, y_offset))
+            surface.blit(text, (10, y_offset))
             y_offset += text.get_height() + 5
+    return surface
 
-    screen.blit(rule_box, (box_x, box_y))
+# New function to draw the game rule screen
+def draw_game_rule_screen():
+    global rule_box
+    screen.blit(background_image, (0, 0))
+    title = render_text("Game Rules", int(HEIGHT * 0.1), WHITE)
+    screen.blit(title, title.get_rect(center=(WIDTH // 2, HEIGHT // 10)))
+
+    # Draw rules text in a scrollable box
+    if rule_box is None or rule_box.get_size() != (WIDTH - 100, HEIGHT - 150):
+        rule_box = compose_rule_box(WIDTH, HEIGHT)
+    screen.blit(rule_box, ((WIDTH - rule_box.get_width()) // 2, HEIGHT // 5))
 
     # Back button
-    back_button = ResponsiveButton(0.45, 0.85, 0.1, 0.1, "Back", close_button_image, text_opacity=255, text_color=WHITE)
-    back_button.update_rect(WIDTH, HEIGHT)
-    back_button.draw(screen)
-    return back_button
+    rule_back_button.update_rect(WIDTH, HEIGHT)
+    rule_back_button.draw(screen)
+    return rule_back_button
+
 
+hud_values = None
 
 def draw_ui():
+    global hud_values
 
+    ui_rect = screen.blit(ui_background_image, (BOARD_WIDTH, 0))
+    ui_x = BOARD_WIDTH
+    player1_resources = sim.players[0].resources
+    player2_resources = sim.players[1].resources
 
-    screen.blit(ui_background_image, (GRID_SIZE * TILE_SIZE, 0))
-    ui_x = GRID_SIZE * TILE_SIZE
+    values = (tuple(player1_resources.values()), tuple(player2_resources.values()), sim.remaining_time)
+    if values != hud_values:
+        presenter.add(ui_rect)
+        hud_values = values
     
-    font = pygame.font.Font(None, 36)
-    resources_title = font.render("Player Resources", True, WHITE)
+    resources_title = render_text("Player Resources", 36, WHITE)
     screen.blit(resources_title, resources_title.get_rect(centerx=ui_x + UI_WIDTH // 2, top=50))
     
-    blue_title = font.render("Blue Player", True, BLUE)
+    blue_title = render_text("Blue Player", 36, BLUE)
     screen.blit(blue_title, blue_title.get_rect(centerx=ui_x + UI_WIDTH // 2, top=100))
-    screen.blit(font.render(f"Gold: {player1_resources['Gold']}", True, WHITE), (ui_x + UI_WIDTH // 2 - 50, 140))
-    screen.blit(font.render(f"Wood: {player1_resources['Wood']}", True, WHITE), (ui_x + UI_WIDTH // 2 - 50, 180))
-    screen.blit(font.render(f"Points: {player1_resources['Points']}", True, WHITE), (ui_x + UI_WIDTH // 2 - 50, 220))
+    screen.blit(render_text(f"Gold: {player1_resources['Gold']}", 36, WHITE), (ui_x + UI_WIDTH // 2 - 50, 140))
+    screen.blit(render_text(f"Wood: {player1_resources['Wood']}", 36, WHITE), (ui_x + UI_WIDTH // 2 - 50, 180))
+    screen.blit(render_text(f"Points: {player1_resources['Points']}", 36, WHITE), (ui_x + UI_WIDTH // 2 - 50, 220))
     
-    red_title = font.render("Red Player", True, RED)
+    red_title = render_text("Red Player", 36, RED)
     screen.blit(red_title, red_title.get_rect(centerx=ui_x + UI_WIDTH // 2, top=280))
-    screen.blit(font.render(f"Gold: {player2_resources['Gold']}", True, WHITE), (ui_x + UI_WIDTH // 2 - 50, 320))
-    screen.blit(font.render(f"Wood: {player2_resources['Wood']}", True, WHITE), (ui_x + UI_WIDTH // 2 - 50, 360))
-    screen.blit(font.render(f"Points: {player2_resources['Points']}", True, WHITE), (ui_x + UI_WIDTH // 2 - 50, 400))
+    screen.blit(render_text(f"Gold: {player2_resources['Gold']}", 36, WHITE), (ui_x + UI_WIDTH // 2 - 50, 320))
+    screen.blit(render_text(f"Wood: {player2_resources['Wood']}", 36, WHITE), (ui_x + UI_WIDTH // 2 - 50, 360))
+    screen.blit(render_text(f"Points: {player2_resources['Points']}", 36, WHITE), (ui_x + UI_WIDTH // 2 - 50, 400))
     
     if game_state["screen"] == "playing":
-        timer_title = font.render("Time Remaining", True, WHITE)
+        timer_title = render_text("Time Remaining", 36, WHITE)
         screen.blit(timer_title, timer_title.get_rect(centerx=ui_x + UI_WIDTH // 2, top=460))
-        remaining_time = max(0, int(game_state["game_duration"] - (time.time() - game_state["start_time"])))
-        timer_text = font.render(f"{remaining_time} s", True, WHITE)
+        timer_text = render_text(f"{sim.remaining_time} s", 36, WHITE)
         screen.blit(timer_text, timer_text.get_rect(centerx=ui_x + UI_WIDTH // 2, top=500))
 
 
@@ -545,8 +675,7 @@ def draw_tooltip(screen, text, mouse_pos):
     """
     Draws a tooltip near the mouse cursor
     """
-    font = pygame.font.Font(None, 24)
-    tooltip_text = font.render(text, True, (255, 255, 255))
+    tooltip_text = render_text(text, 24, (255, 255, 255))
     tooltip_bg = pygame.Surface((tooltip_text.get_width() + 10, tooltip_text.get_height() + 10))
     tooltip_bg.fill((40, 40, 60))
     pygame.draw.rect(tooltip_bg, (100, 100, 140), tooltip_bg.get_rect(), 2)
@@ -566,30 +695,38 @@ def draw_tooltip(screen, text, mouse_pos):
 
 
 # Modified draw_start_screen to include close_button
-def draw_start_screen():
+# Gradient plus translucent background image, composed once per window size
+start_background = None
+
+def compose_start_background(width, height):
     # Create a gradient background effect instead of a flat image
-    gradient_surface = pygame.Surface((WIDTH, HEIGHT))
-    for y in range(HEIGHT):
-        color_value = int(180 * (1 - y / HEIGHT))  # Darkens from top to bottom
-        gradient_surface.fill((color_value // 3, color_value // 2, color_value), (0, y, WIDTH, 1))
-    
+    surface = pygame.Surface((width, height))
+    for y in range(height):
+        color_value = int(180 * (1 - y / height))  # Darkens from top to bottom
+        surface.fill((color_value // 3, color_value // 2, color_value), (0, y, width, 1))
+
     # Apply the background image with some transparency over the gradient
-    screen.blit(gradient_surface, (0, 0))
-    temp_bg = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    temp_bg = pygame.Surface((width, height), pygame.SRCALPHA)
     temp_bg.blit(background_image, (0, 0))
     temp_bg.set_alpha(180)  # Semi-transparent background
-    screen.blit(temp_bg, (0, 0))
+    surface.blit(temp_bg, (0, 0))
+    return surface.convert()
+
+def draw_start_screen():
+    global start_background
+    if start_background is None or start_background.get_size() != (WIDTH, HEIGHT):
+        start_background = compose_start_background(WIDTH, HEIGHT)
+    screen.blit(start_background, (0, 0))
     
     # Add particle effects in the background
-    for particle in particles:
-        particle.update()
-        particle.draw(screen)
+    update_ambient_particles()
+    ambient_particles.draw(screen)
     
     # Create a glowing, animated title
     title_scale = 1.0 + 0.05 * math.sin(pygame.time.get_ticks() / 500)  # Pulsing effect
-    title_font = pygame.font.Font(None, int(HEIGHT * 0.1 * title_scale))
-    title_shadow = title_font.render("Two Player RTS Game", True, (30, 30, 50))
-    title = title_font.render("Two Player RTS Game", True, (220, 220, 255))
+    title_size = int(HEIGHT * 0.1 * title_scale)
+    title_shadow = render_text("Two Player RTS Game", title_size, (30, 30, 50))
+    title = render_text("Two Player RTS Game", title_size, (220, 220, 255))
     
     # Add shadow effect to the title
     screen.blit(title_shadow, title_shadow.get_rect(center=(WIDTH // 2 + 4, HEIGHT // 4 + 4)))
@@ -600,8 +737,7 @@ def draw_start_screen():
                     (WIDTH // 4 * 3, HEIGHT // 4 + 30), 3)
     
     # Create an improved subtitle with better styling
-    subtitle_font = pygame.font.Font(None, int(HEIGHT * 0.05))
-    subtitle = subtitle_font.render("Select Game Duration", True, (200, 200, 255))
+    subtitle = render_text("Select Game Duration", int(HEIGHT * 0.05), (200, 200, 255))
     screen.blit(subtitle, subtitle.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100)))
     
     # Add hover animations and improved styling to buttons
@@ -663,14 +799,12 @@ def draw_start_screen():
                 draw_tooltip(screen, "Match History", mouse_pos)
     
     # Add a version number in the corner
-    version_font = pygame.font.Font(None, int(HEIGHT * 0.02))
-    version_text = version_font.render("v1.0.2", True, (150, 150, 150))
+    version_text = render_text("v1.0.2", int(HEIGHT * 0.02), (150, 150, 150))
     screen.blit(version_text, (WIDTH - 60, HEIGHT - 30))
 # Modified draw_game_over_screen and draw_game_draw_screen to include close_button
 def draw_game_over_screen(winner):
     screen.blit(game_finish_background, (0, 0))
-    title_font = pygame.font.Font(None, int(HEIGHT * 0.1))
-    winner_text = title_font.render(f"{winner} Player Wins!", True, BLACK)
+    winner_text = render_text(f"{winner} Player Wins!", int(HEIGHT * 0.1), BLACK)
     screen.blit(winner_text, winner_text.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
     
     start_button.text = ""
@@ -683,8 +817,7 @@ def draw_game_over_screen(winner):
 
 def draw_game_draw_screen():
     screen.blit(game_finish_background, (0, 0))
-    title_font = pygame.font.Font(None, int(HEIGHT * 0.1))
-    draw_text = title_font.render("Game Draw!", True, BLACK)
+    draw_text = render_text("Game Draw!", int(HEIGHT * 0.1), BLACK)
     screen.blit(draw_text, draw_text.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
     
     start_button.text = ""
@@ -695,33 +828,88 @@ def draw_game_draw_screen():
     close_button.update_rect(WIDTH, HEIGHT)
     close_button.draw(screen)  # Show close_button on game_draw screen
 
+history_page_cache = None
+
+def history_page_count():
+    return max(1, -(-len(score_store) // HISTORY_PAGE_SIZE))
+
+def get_history_page():
+    # Only the shown page is read from disk, and only when it or the history changes
+    global history_page_cache
+    key = (history_page, len(score_store))
+    if history_page_cache is None or history_page_cache[0] != key:
+        history_page_cache = (key, score_store.page(history_page, HISTORY_PAGE_SIZE))
+    return history_page_cache[1]
+
+def turn_history_page(delta):
+    global history_page
+    history_page = min(max(history_page + delta, 0), history_page_count() - 1)
+
 def draw_history_screen():
     screen.blit(background_image, (0, 0))
-    title_font = pygame.font.Font(None, int(HEIGHT * 0.1))
-    title = title_font.render("Score History", True, WHITE)
+    title = render_text("Score History", int(HEIGHT * 0.1), WHITE)
     screen.blit(title, title.get_rect(center=(WIDTH // 2, HEIGHT // 4)))
 
-    history_font = pygame.font.Font(None, int(HEIGHT * 0.035))
     history_rect = pygame.Rect(WIDTH // 2 - 200, HEIGHT // 2 - 100, 400, 200)
     pygame.draw.rect(screen, (50, 50, 50, 180), history_rect, 0, 5)
 
     y_offset = HEIGHT // 2 - 70
-    for i, game in enumerate(reversed(score_history)):
-        if game["winner"] == "Blue":
+    for number, (winner, blue_points, red_points) in get_history_page():
+        if winner == "Blue":
             color = BLUE
-        elif game["winner"] == "Red":
+        elif winner == "Red":
             color = RED
         else:
             color = WHITE
-        text = f"Game {len(score_history) - i}: Blue ({game['blue_points']}) vs Red ({game['red_points']})"
-        history_text = history_font.render(text, True, color)
+        text = f"Game {number + 1}: Blue ({blue_points:.10g}) vs Red ({red_points:.10g})"
+        history_text = render_text(text, int(HEIGHT * 0.035), color)
         screen.blit(history_text, history_text.get_rect(center=(WIDTH // 2, y_offset)))
         y_offset += 30
 
-    back_button = ResponsiveButton(0.45, 0.8, 0.1, 0.1, " ", close_button_image)
-    back_button.update_rect(WIDTH, HEIGHT)
-    back_button.draw(screen)
-    return back_button
+    page_text = render_text(f"Page {history_page + 1} of {history_page_count()}", int(HEIGHT * 0.035), WHITE)
+    screen.blit(page_text, page_text.get_rect(center=(WIDTH // 2, history_rect.bottom + 20)))
+    wins = score_store.wins
+    averages = score_store.average_points()
+    summary = (f"Blue {wins['Blue']} - Red {wins['Red']} - Draws {wins['Draw']}   "
+               f"Avg points: Blue {averages['Blue']:.1f} / Red {averages['Red']:.1f}")
+    summary_text = render_text(summary, int(HEIGHT * 0.035), WHITE)
+    screen.blit(summary_text, summary_text.get_rect(center=(WIDTH // 2, history_rect.bottom + 50)))
+
+    for button in (history_newer_button, history_older_button):
+        button.update_rect(WIDTH, HEIGHT)
+        button.draw(screen)
+    history_back_button.update_rect(WIDTH, HEIGHT)
+    history_back_button.draw(screen)
+    return history_back_button
+
+def draw_event_overlay():
+    records = event_log.recent(EVENT_OVERLAY_LINES)
+    if not records:
+        return
+    line_height = 18
+    overlay = pygame.Surface((BOARD_WIDTH, line_height * len(records) + 10), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 160))
+    for i, record in enumerate(records):
+        overlay.blit(render_text(format_record(record), 20, WHITE), (5, 5 + i * line_height))
+    presenter.add(screen.blit(overlay, (0, HEIGHT - overlay.get_height())))
+
+def draw_profile_overlay():
+    global profile_overlay
+    # Percentiles only move slowly, so rebuild the table a few times a second
+    if profile_overlay is None or profiler.frame_count % PROFILE_OVERLAY_REFRESH == 0:
+        line_height = 18
+        report = profiler.report()
+        profile_overlay = pygame.Surface((230, line_height * (len(report) + 1) + 10), pygame.SRCALPHA)
+        profile_overlay.fill((0, 0, 0, 180))
+        columns = (5, 100, 145, 190)
+        for col, header in zip(columns, ("ms", "p50", "p95", "p99")):
+            profile_overlay.blit(render_text(header, 20, GRAY), (col, 5))
+        for row, (phase, values) in enumerate(report.items(), 1):
+            y = 5 + row * line_height
+            profile_overlay.blit(render_text(phase, 20, WHITE), (columns[0], y))
+            for col, value in zip(columns[1:], values):
+                profile_overlay.blit(render_text(f"{value:.2f}", 20, WHITE), (col, y))
+    presenter.add(screen.blit(profile_overlay, (0, 0)))
 
 def draw_dialogue_box(message):
     global dialogue_alpha, dialogue_active
@@ -732,8 +920,7 @@ def draw_dialogue_box(message):
     dialogue_surface = pygame.Surface((300, 100), pygame.SRCALPHA)
     dialogue_surface.fill((50, 50, 50, dialogue_alpha))
     
-    font = pygame.font.Font(None, 36)
-    text = font.render(message, True, WHITE)
+    text = render_text(message, 36, WHITE)
     text_rect = text.get_rect(center=(150, 50))
     dialogue_surface.blit(text, text_rect)
     
@@ -746,19 +933,9 @@ def draw_dialogue_box(message):
 
 def draw_mode_selection_screen():
     screen.blit(background_image, (0, 0))
-    title_font = pygame.font.Font(None, int(HEIGHT * 0.1))
-    title = title_font.render("Select Difficulty", True, WHITE)
+    title = render_text("Select Difficulty", int(HEIGHT * 0.1), WHITE)
     screen.blit(title, title.get_rect(center=(WIDTH // 2, HEIGHT // 4)))
 
-    # Use generic button image for mode selection
-    button_image = generic_button_image
-
-    mode_buttons = [
-        ResponsiveButton(0.3, 0.5, 0.15, 0.1, "Easy", button_image, text_opacity=255, text_color=WHITE),
-        ResponsiveButton(0.45, 0.5, 0.15, 0.1, "Medium", button_image, text_opacity=255, text_color=WHITE),
-        ResponsiveButton(0.6, 0.5, 0.15, 0.1, "Hard", button_image, text_opacity=255, text_color=WHITE)
-    ]
-
     mouse_pos = pygame.mouse.get_pos()
     for button in mode_buttons:
         button.update_rect(WIDTH, HEIGHT)
@@ -780,301 +957,55 @@ def toggle_sound():
     else:
         pygame.mixer.music.pause()
 
-def collect_resources(player_pos, player_resources):
-    global resources
-    px, py = int(player_pos[0]), int(player_pos[1])
-    if (py, px) in resources:
-        resource = resources[(py, px)]
-        amount = resource["amount"]
-        if resource["type"] == "Gold":
-            player_resources['Gold'] += amount
-            points = amount * 50
-        elif resource["type"] == "Wood":
-            player_resources['Wood'] += amount
-            points = amount * 30
-        else:
-            points = 0
-        
-        if points > 0:
-            resource_collect_sound.play()
-            player_resources['Points'] += points
-        del resources[(py, px)]
-        resource_collection_effect(player_pos, {"Gold": amount if resource["type"] == "Gold" else 0, "Wood": amount if resource["type"] == "Wood" else 0})
-        return points
-    return 0
-
-def build_structure(player_pos, player_resources, building_type, player_id):
-    global buildings
-    px, py = int(player_pos[0]), int(player_pos[1])
-    pos = (py, px)
-    
-    if pos in buildings:
-        print(f"Cannot build {building_type} at {pos}: Tile already has a building.")
-        return False
-    if pos in resources:
-        print(f"Cannot build {building_type} at {pos}: Tile has resources.")
-        return False
-    
-    if building_type == "Gold Mine":
-        if player_resources["Gold"] >= 10:
-            player_resources["Gold"] -= 10
-            buildings[pos] = {"type": "Gold Mine", "owner": player_id, "last_generated": time.time()}
-            build_sound.play()
-            player_resources["Points"] += 100
-            print(f"Player {player_id} built a Gold Mine at {pos}")
-            return True
-        else:
-            print(f"Player {player_id} lacks gold (has {player_resources['Gold']}, needs 10) for Gold Mine")
-    elif building_type == "Lumber Mill":
-        if player_resources["Wood"] >= 10:
-            player_resources["Wood"] -= 10
-            buildings[pos] = {"type": "Lumber Mill", "owner": player_id, "last_generated": time.time()}
-            build_sound.play()
-            player_resources["Points"] += 75
-            print(f"Player {player_id} built a Lumber Mill at {pos}")
-            return True
-        else:
-            print(f"Player {player_id} lacks wood (has {player_resources['Wood']}, needs 10) for Lumber Mill")
-    
-    return False
-
-def generate_building_resources():
-    current_time = time.time()
-    if (current_time - game_state["last_building_generation"]) >= 5:
-        for pos, building in buildings.items():
-            owner_resources = player1_resources if building["owner"] == 1 else player2_resources
-            if building["type"] == "Gold Mine":
-                owner_resources["Gold"] += 1
-                print(f"Gold Mine at {pos} generated 1 Gold for Player {building['owner']}")
-            elif building["type"] == "Lumber Mill":
-                owner_resources["Wood"] += 1
-                print(f"Lumber Mill at {pos} generated 1 Wood for Player {building['owner']}")
-            building["last_generated"] = current_time
-        game_state["last_building_generation"] = current_time
-
-# Modified check_obstacle_collision function
-def check_obstacle_collision(player_pos, player_resources, player_id):
-    global player1_on_obstacle, player2_on_obstacle, player1_last_obstacle_deduction, player2_last_obstacle_deduction
-    px, py = int(player_pos[0]), int(player_pos[1])
-    pos = (py, px)
-    current_time = time.time()
-
-    if pos in obstacles and player_resources["Points"] > 0:
-        obstacle_type = obstacles[pos]
-        multiplier = MODE_MULTIPLIERS.get(selected_mode, 1.0)  # Default to 1.0 if mode is None
-        initial_penalty = BASE_PENALTIES[obstacle_type]["initial"] * multiplier
-        continuous_penalty = BASE_PENALTIES[obstacle_type]["continuous"] * multiplier
-
-        # Handle initial collision
-        if (player_id == 1 and not player1_on_obstacle) or (player_id == 2 and not player2_on_obstacle):
-            player_resources["Points"] = max(0, player_resources["Points"] - initial_penalty)
-            resource_collect_sound.play()
-            print(f"Player {player_id} hit {obstacle_type} at {pos}, lost {initial_penalty} points (initial)")
-            if player_id == 1:
-                player1_on_obstacle = True
-                player1_last_obstacle_deduction = current_time
-            else:
-                player2_on_obstacle = True
-                player2_last_obstacle_deduction = current_time
-
-        # Handle continuous deduction every 2 seconds
-        if player_id == 1 and player1_on_obstacle:
-            time_since_last_deduction = current_time - player1_last_obstacle_deduction
-            if time_since_last_deduction >= OBSTACLE_CHECK_INTERVAL:
-                player_resources["Points"] = max(0, player_resources["Points"] - continuous_penalty)
-                resource_collect_sound.play()
-                print(f"Player {player_id} on {obstacle_type} at {pos}, lost {continuous_penalty} points (continuous)")
-                player1_last_obstacle_deduction = current_time
-        elif player_id == 2 and player2_on_obstacle:
-            time_since_last_deduction = current_time - player2_last_obstacle_deduction
-            if time_since_last_deduction >= OBSTACLE_CHECK_INTERVAL:
-                player_resources["Points"] = max(0, player_resources["Points"] - continuous_penalty)
-                resource_collect_sound.play()
-                print(f"Player {player_id} on {obstacle_type} at {pos}, lost {continuous_penalty} points (continuous)")
-                player2_last_obstacle_deduction = current_time
-    else:
-        # Reset obstacle status when player is off the obstacle
-        if player_id == 1 and player1_on_obstacle:
-            player1_on_obstacle = False
-        elif player_id == 2 and player2_on_obstacle:
-            player2_on_obstacle = False
-
-
-def save_score_history():
-    try:
-        with open(SCORE_FILE, 'w') as f:
-            json.dump(score_history, f)
-    except Exception as e:
-        print(f"Error saving score history: {e}")
-
-def determine_winner():
-    blue_points = player1_resources["Points"]
-    red_points = player2_resources["Points"]
-    if blue_points > red_points:
-        winner = "Blue"
-    elif blue_points < red_points:
-        winner = "Red"
-    else:
-        winner = "Draw"
-    
-    score_history.append({
-        "winner": winner,
-        "blue_points": blue_points,
-        "red_points": red_points
-    })
-    if len(score_history) > MAX_HISTORY:
-        score_history.pop(0)
-    save_score_history()
-    
-    return winner
-class Particle:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.vx = random.uniform(-0.5, 0.5)
-        self.vy = random.uniform(-0.5, 0.5)
-        self.size = random.randint(1, 3)
-        self.color = (
-            random.randint(100, 200),
-            random.randint(100, 200),
-            random.randint(200, 255),
-            random.randint(20, 100)
-        )
-        self.life = random.randint(30, 100)
-    
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.life -= 1
-        
-        # Fade out as life decreases
-        if self.color[3] > 0:
-            alpha = int(self.color[3] * (self.life / 100))
-            self.color = (self.color[0], self.color[1], self.color[2], alpha)
-    
-    def draw(self, surface):
-        if self.life > 0:
-            s = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
-            pygame.draw.circle(s, self.color, (self.size, self.size), self.size)
-            surface.blit(s, (int(self.x), int(self.y)))
-
-# Create initial particles
-particles = []
-for _ in range(50):
-    particles.append(Particle(
-        random.randint(0, WIDTH),
-        random.randint(0, HEIGHT)
-    ))
-
-# Add this to your game loop to maintain particles
-def update_particles():
-    # Remove dead particles
-    global particles
-    particles = [p for p in particles if p.life > 0]
-    
-    # Add new particles occasionally
-    if len(particles) < 50 and random.random() < 0.1:
-        particles.append(Particle(
-            random.randint(0, WIDTH),
-            random.randint(0, HEIGHT)
-        ))
-def generate_resources():
-    current_time = time.time()
-    interval = RESOURCE_GENERATION_INTERVAL / (1 + 0.2 * max(player1_upgrades.upgrades['resource_generation'].current_level, player2_upgrades.upgrades['resource_generation'].current_level))
-    if (current_time - game_state["last_resource_generation"]) >= interval:
-        empty_cells = [(r, c) for r in range(GRID_SIZE) for c in range(GRID_SIZE) if (r, c) not in resources and (r, c) not in buildings]
-        if empty_cells:
-            num_resources = min(len(empty_cells), random.randint(1, 3))
-            resource_cells = random.sample(empty_cells, num_resources)
-            for cell in resource_cells:
-                resource_type = 'Gold' if len(resources) % 2 == 0 else 'Wood'
-                resources[cell] = {
-                    "type": resource_type,
-                    "amount": GOLD_GENERATION_AMOUNT if resource_type == 'Gold' else WOOD_GENERATION_AMOUNT,
-                    "spawn_time": current_time
-                }
-        game_state['last_resource_generation'] = current_time
-
-class Upgrade:
-    def __init__(self, name, description, base_cost, max_level, effect_function):
-        self.name = name
-        self.description = description
-        self.base_cost = base_cost
-        self.max_level = max_level
-        self.current_level = 0
-        self.effect_function = effect_function
-
-    def can_upgrade(self, resources):
-        return resources >= self.get_current_cost()
-
-    def get_current_cost(self):
-        return self.base_cost * (2 ** self.current_level)
-
-    def apply_upgrade(self):
-        if self.current_level < self.max_level:
-            self.current_level += 1
-            return True
-        return False
-
-class PlayerUpgrades:
-    def __init__(self):
-        self.upgrades = {
-            'resource_generation': Upgrade('Resource Generation', 'Increase resource generation speed', 50, 5, self.modify_resource_generation),
-            'movement_speed': Upgrade('Movement Speed', 'Increase player movement speed', 75, 3, self.modify_movement_speed),
-            'vision_radius': Upgrade('Vision Radius', 'Expand player vision', 100, 3, self.modify_vision_radius)
-        }
-    
-    def modify_resource_generation(self, current_value):
-        return current_value * (1 + 0.2 * self.upgrades['resource_generation'].current_level)
-
-    def modify_movement_speed(self, current_value):
-        return current_value * (1 + 0.15 * self.upgrades['movement_speed'].current_level)
-
-    def modify_vision_radius(self, current_value):
-        return current_value + self.upgrades['vision_radius'].current_level
-
-    def can_upgrade(self, upgrade_name, resources):
-        return self.upgrades[upgrade_name].can_upgrade(resources)
-
-    def upgrade(self, upgrade_name, resources):
-        upgrade = self.upgrades[upgrade_name]
-        if upgrade.can_upgrade(resources):
-            if upgrade.apply_upgrade():
-                return upgrade.get_current_cost()
-        return 0
-
-player1_upgrades = PlayerUpgrades()
-player2_upgrades = PlayerUpgrades()
-
-class ResourceParticle:
-    def __init__(self, x, y, resource_type):
-        self.x = x
-        self.y = y
-        self.resource_type = resource_type
-        self.color = GOLD_COLOR if resource_type == 'Gold' else WOOD_COLOR
-        self.size = random.randint(3, 7)
-        self.velocity_x = random.uniform(-2, 2)
-        self.velocity_y = random.uniform(-3, -1)
-        self.alpha = 255
-        
-    def update(self):
-        self.x += self.velocity_x
-        self.y += self.velocity_y
-        self.velocity_y += 0.2
-        self.alpha = max(0, self.alpha - 10)
-        return self.alpha > 0
-        
-    def draw(self, screen):
-        particle_surface = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
-        pygame.draw.circle(particle_surface, (*self.color, self.alpha), (self.size//2, self.size//2), self.size//2)
-        screen.blit(particle_surface, (int(self.x), int(self.y)))
+def record_match_result(winner):
+    blue_points = sim.players[0].resources["Points"]
+    red_points = sim.players[1].resources["Points"]
+    score_store.append(winner, blue_points, red_points)
+
+# Start-screen ambience and resource-collection bursts
+ambient_particles = ParticleSystem()
+effect_particles = ParticleSystem()
+
+def spawn_ambient_particles(count):
+    rng = ambient_particles.rng
+    alpha = rng.integers(20, 101, count)
+    life = rng.integers(30, 101, count)
+    # Colors are snapped to a coarse palette so the sprite cache stays small
+    color = np.stack([
+        rng.integers(100, 201, count) // 25 * 25,
+        rng.integers(100, 201, count) // 25 * 25,
+        rng.integers(200, 256, count) // 25 * 25
+    ], axis=1)
+    ambient_particles.emit(
+        rng.integers(0, WIDTH + 1, count), rng.integers(0, HEIGHT + 1, count),
+        rng.uniform(-0.5, 0.5, count), rng.uniform(-0.5, 0.5, count),
+        life, alpha, rng.integers(1, 4, count), color,
+        fade=alpha / life
+    )
+
+spawn_ambient_particles(AMBIENT_PARTICLE_COUNT)
+
+def update_ambient_particles():
+    ambient_particles.update()
+    # Top up occasionally so the background never empties out
+    missing = AMBIENT_PARTICLE_COUNT - len(ambient_particles)
+    if missing > 0:
+        spawn_ambient_particles(int(ambient_particles.rng.binomial(missing, 0.1)))
 
 def resource_collection_effect(pos, resources_collected):
     x = pos[0] * TILE_SIZE + TILE_SIZE // 2
     y = pos[1] * TILE_SIZE + TILE_SIZE // 2
+    rng = effect_particles.rng
     for resource_type, amount in resources_collected.items():
-        for _ in range(amount * 2):
-            particles.append(ResourceParticle(x, y, resource_type))
+        count = amount * 2
+        if count <= 0:
+            continue
+        effect_particles.emit(
+            x, y, rng.uniform(-2, 2, count), rng.uniform(-3, -1, count),
+            256, 255, rng.integers(3, 8, count) // 2,
+            GOLD_COLOR if resource_type == 'Gold' else WOOD_COLOR,
+            gravity=0.2, fade=10
+        )
 
 def play_background_music():
     if not pygame.mixer.music.get_busy():
@@ -1082,60 +1013,134 @@ def play_background_music():
         pygame.mixer.music.set_volume(0.1)
         pygame.mixer.music.play(-1)
 
+# Key bindings for in-match actions: key -> (player id, action)
+ACTION_KEYS = {
+    pygame.K_1: (1, ("upgrade", "resource_generation")),
+    pygame.K_2: (1, ("upgrade", "movement_speed")),
+    pygame.K_3: (1, ("upgrade", "vision_radius")),
+    pygame.K_4: (1, ("build", "Gold Mine")),
+    pygame.K_5: (1, ("build", "Lumber Mill")),
+    pygame.K_7: (2, ("upgrade", "resource_generation")),
+    pygame.K_8: (2, ("upgrade", "movement_speed")),
+    pygame.K_9: (2, ("upgrade", "vision_radius")),
+    pygame.K_i: (2, ("build", "Gold Mine")),
+    pygame.K_o: (2, ("build", "Lumber Mill"))
+}
+
+# Movement keys per player, in priority order
+MOVE_KEYS = {
+    1: [(pygame.K_UP, "up"), (pygame.K_DOWN, "down"), (pygame.K_LEFT, "left"), (pygame.K_RIGHT, "right")],
+    2: [(pygame.K_w, "up"), (pygame.K_s, "down"), (pygame.K_a, "left"), (pygame.K_d, "right")]
+}
+
+def read_move_direction(keys, player_id):
+    for key, direction in MOVE_KEYS[player_id]:
+        if keys[key]:
+            return direction
+    return None
+
+def save_recording(recording):
+    try:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        recording.save(os.path.join(REPLAY_DIR, f"match-{recording.seed}.rtsr"))
+    except OSError as e:
+        print(f"Error saving replay: {e}")
+
+def unit_positions():
+    return {player.id: tuple(player.pos) for player in sim.players}
+
+def interpolated_positions(previous, alpha):
+    """
+    A ``position_of`` for draw_units placing each unit ``alpha`` of the way from where
+    it was before the last tick (``previous``, by player id) to where it is now.
+    """
+    def position_of(player):
+        (previous_x, previous_y), (x, y) = previous[player.id], player.pos
+        return (previous_x + (x - previous_x) * alpha, previous_y + (y - previous_y) * alpha)
+    return position_of
+
+def handle_sim_events():
+    """
+    Plays sounds and spawns particles for everything the simulation reported this tick.
+    Returns the winner if the match ended, otherwise None.
+    """
+    winner = None
+    for event in sim.drain_events():
+        kind = event[0]
+        if kind == "move":
+            sounds.play("move")
+        elif kind == "collect":
+            _, _, pos, collected, points = event
+            if points > 0:
+                sounds.play("collect")
+            resource_collection_effect(pos, collected)
+        elif kind == "build":
+            sounds.play("build")
+        elif kind == "penalty":
+            sounds.play("collect")
+        elif kind == "game_over":
+            winner = event[1]
+    return winner
+
 # Modified main function
-def main():
-    global game_state, particles, dialogue_active, dialogue_alpha, selected_mode
-    global player1_on_obstacle, player2_on_obstacle, player1_last_obstacle_deduction, player2_last_obstacle_deduction
+def main(bot_players=()):
+    global game_state, dialogue_active, dialogue_alpha, show_event_overlay, show_profile_overlay, history_page, cameras
     play_background_music()
     
-    move_cooldown1 = MOVE_DELAY
-    move_cooldown2 = MOVE_DELAY
     running = True
     winner = None
     clock = pygame.time.Clock()
+    frame_time = 0.0
+    tick_dt = 1.0 / TICK_RATE
+    # Real time not yet simulated, and unit positions before the last tick
+    accumulator = 0.0
+    previous_positions = unit_positions()
+    # Key presses wait here until a tick consumes them, even when frames outpace ticks
+    actions = {1: [], 2: []}
+    recording = None
+    # Seats in ``bot_players`` are played by bots sharing one distance field
+    field = DistanceField(sim)
+    bots = [Bot(player_id, field) for player_id in bot_players]
+    # Fog shows what the people at the keyboard can see; with no human seat, everything
+    cameras = create_cameras(tuple(player_id for player_id in (1, 2) if player_id not in bot_players) or (1, 2))
 
     # Reset button states when starting the game
     reset_button_states()
 
     while running:
+        profiler.begin_frame()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_m:
                     toggle_sound()
-                if game_state["screen"] == "playing":
-                    # Check obstacle collision for both players
-                    check_obstacle_collision(player1_pos, player1_resources, 1)
-                    check_obstacle_collision(player2_pos, player2_resources, 2)
-                    
-                    # Handle upgrade keys for player 1
-                    if event.key == pygame.K_1 and player1_resources['Gold'] >= player1_upgrades.upgrades['resource_generation'].get_current_cost():
-                        cost = player1_upgrades.upgrade('resource_generation', player1_resources['Gold'])
-                        player1_resources['Gold'] -= cost
-                    elif event.key == pygame.K_2 and player1_resources['Gold'] >= player1_upgrades.upgrades['movement_speed'].get_current_cost():
-                        cost = player1_upgrades.upgrade('movement_speed', player1_resources['Gold'])
-                        player1_resources['Gold'] -= cost
-                    elif event.key == pygame.K_3 and player1_resources['Gold'] >= player1_upgrades.upgrades['vision_radius'].get_current_cost():
-                        cost = player1_upgrades.upgrade('vision_radius', player1_resources['Gold'])
-                        player1_resources['Gold'] -= cost
-                    elif event.key == pygame.K_4:
-                        build_structure(player1_pos, player1_resources, "Gold Mine", 1)
-                    elif event.key == pygame.K_5:
-                        build_structure(player1_pos, player1_resources, "Lumber Mill", 1)
-                    elif event.key == pygame.K_7 and player2_resources['Gold'] >= player2_upgrades.upgrades['resource_generation'].get_current_cost():
-                        cost = player2_upgrades.upgrade('resource_generation', player2_resources['Gold'])
-                        player2_resources['Gold'] -= cost
-                    elif event.key == pygame.K_8 and player2_resources['Gold'] >= player2_upgrades.upgrades['movement_speed'].get_current_cost():
-                        cost = player2_upgrades.upgrade('movement_speed', player2_resources['Gold'])
-                        player2_resources['Gold'] -= cost
-                    elif event.key == pygame.K_9 and player2_resources['Gold'] >= player2_upgrades.upgrades['vision_radius'].get_current_cost():
-                        cost = player2_upgrades.upgrade('vision_radius', player2_resources['Gold'])
-                        player2_resources['Gold'] -= cost
-                    elif event.key == pygame.K_i:
-                        build_structure(player2_pos, player2_resources, "Gold Mine", 2)
-                    elif event.key == pygame.K_o:
-                        build_structure(player2_pos, player2_resources, "Lumber Mill", 2)
+                if event.key == pygame.K_l:
+                    show_event_overlay = not show_event_overlay
+                    presenter.invalidate()
+                if event.key == pygame.K_p:
+                    show_profile_overlay = not show_profile_overlay
+                    presenter.invalidate()
+                if game_state["screen"] == "history" and event.key in (pygame.K_LEFT, pygame.K_PAGEUP):
+                    turn_history_page(-1)
+                if game_state["screen"] == "history" and event.key in (pygame.K_RIGHT, pygame.K_PAGEDOWN):
+                    turn_history_page(1)
+                if game_state["screen"] == "playing" and event.key == pygame.K_F5:
+                    try:
+                        snapshot.save(sim, QUICKSAVE_FILE)
+                    except OSError as e:
+                        print(f"Error saving snapshot: {e}")
+                if game_state["screen"] == "playing" and event.key == pygame.K_F9:
+                    try:
+                        snapshot.load(sim, QUICKSAVE_FILE)
+                        previous_positions = unit_positions()
+                        # The recording no longer describes the match being played
+                        recording = None
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading snapshot: {e}")
+                if game_state["screen"] == "playing" and event.key in ACTION_KEYS:
+                    player_id, action = ACTION_KEYS[event.key]
+                    actions[player_id].append(action)
 
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
@@ -1143,28 +1148,29 @@ def main():
                     if event.button == 1:
                         for button in timer_buttons:
                             if button.is_clicked(event.pos):
-                                button_click_sound.play()
+                                sounds.play("button_click")
                                 for b in timer_buttons:
                                     b.is_selected = False
                                 button.is_selected = True
                                 game_state["selected_duration"] = int(button.text.replace("s", ""))
                         if start_button.is_clicked(mouse_pos):
                             if game_state["selected_duration"] > 0:
-                                button_click_sound.play()
+                                sounds.play("button_click")
                                 game_state["screen"] = "mode_selection"
                             else:
-                                button_click_sound.play()
+                                sounds.play("button_click")
                                 dialogue_active = True
                                 dialogue_alpha = 255
                         if close_button.is_clicked(mouse_pos):
-                            button_click_sound.play()
+                            sounds.play("button_click")
                             running = False
                         if history_button.is_clicked(mouse_pos):
-                            button_click_sound.play()
+                            sounds.play("button_click")
                             game_state["previous_screen"] = "start"
                             game_state["screen"] = "history"
+                            history_page = 0
                         if game_rule_button.is_clicked(mouse_pos):
-                            button_click_sound.play()
+                            sounds.play("button_click")
                             game_state["previous_screen"] = "start"
                             game_state["screen"] = "game_rule"
                 elif game_state["screen"] == "mode_selection":
@@ -1172,109 +1178,88 @@ def main():
                     if event.button == 1:
                         for button in mode_buttons:
                             if button.is_clicked(mouse_pos):
-                                button_click_sound.play()
+                                sounds.play("button_click")
                                 game_state["selected_mode"] = button.text
-                                reset_game()
+                                sim.reset(button.text, game_state["selected_duration"])
+                                previous_positions = unit_positions()
+                                if RECORD_MATCHES:
+                                    recording = Recording.start(sim)
                                 game_state["screen"] = "playing"
-                                game_state["start_time"] = time.time()
-                                game_state["game_duration"] = game_state["selected_duration"]
                 elif game_state["screen"] == "history":
                     back_button = draw_history_screen()
+                    if history_newer_button.is_clicked(mouse_pos):
+                        sounds.play("button_click")
+                        turn_history_page(-1)
+                    if history_older_button.is_clicked(mouse_pos):
+                        sounds.play("button_click")
+                        turn_history_page(1)
                     if back_button.is_clicked(mouse_pos):
-                        button_click_sound.play()
+                        sounds.play("button_click")
                         game_state["screen"] = game_state["previous_screen"]
                         game_state["previous_screen"] = None
                 elif game_state["screen"] == "game_rule":
                     back_button = draw_game_rule_screen()
                     if back_button.is_clicked(mouse_pos):
-                        button_click_sound.play()
+                        sounds.play("button_click")
                         game_state["screen"] = game_state["previous_screen"]
                         game_state["previous_screen"] = None
                 elif game_state["screen"] in ["game_over", "game_draw"]:
                     if start_button.is_clicked(mouse_pos):
-                        reset_game()
+                        sim.reset()
                         reset_button_states()
                         game_state["screen"] = "start"
                         winner = None
                         for button in timer_buttons:
                             button.is_selected = False
                         game_state["selected_duration"] = 0
-                        player1_on_obstacle = False
-                        player2_on_obstacle = False
                     if close_button.is_clicked(mouse_pos):
                         running = False
 
         keys = pygame.key.get_pressed()
+        profiler.lap("events")
 
         if game_state["screen"] == "playing":
-            move_cooldown1 -= 1
-            if move_cooldown1 <= 0:
-                moved = False
-                if keys[pygame.K_UP] and player1_target[1] > 0:
-                    player1_target[1] -= 1
-                    move_cooldown1 = MOVE_DELAY
-                    moved = True
-                elif keys[pygame.K_DOWN] and player1_target[1] < GRID_SIZE - 1:
-                    player1_target[1] += 1
-                    move_cooldown1 = MOVE_DELAY
-                    moved = True
-                elif keys[pygame.K_LEFT] and player1_target[0] > 0:
-                    player1_target[0] -= 1
-                    move_cooldown1 = MOVE_DELAY
-                    moved = True
-                elif keys[pygame.K_RIGHT] and player1_target[0] < GRID_SIZE - 1:
-                    player1_target[0] += 1
-                    move_cooldown1 = MOVE_DELAY
-                    moved = True
-                if moved:
-                    move_sound.play()
-                    player1_pos[:] = player1_target
-                check_obstacle_collision(player1_pos, player1_resources, 1)
-
-            move_cooldown2 -= 1
-            if move_cooldown2 <= 0:
-                moved = False
-                if keys[pygame.K_w] and player2_target[1] > 0:
-                    player2_target[1] -= 1
-                    move_cooldown2 = MOVE_DELAY
-                    moved = True
-                elif keys[pygame.K_s] and player2_target[1] < GRID_SIZE - 1:
-                    player2_target[1] += 1
-                    move_cooldown2 = MOVE_DELAY
-                    moved = True
-                elif keys[pygame.K_a] and player2_target[0] > 0:
-                    player2_target[0] -= 1
-                    move_cooldown2 = MOVE_DELAY
-                    moved = True
-                elif keys[pygame.K_d] and player2_target[0] < GRID_SIZE - 1:
-                    player2_target[0] += 1
-                    move_cooldown2 = MOVE_DELAY
-                    moved = True
-                if moved:
-                    move_sound.play()
-                    player2_pos[:] = player2_target
-                check_obstacle_collision(player2_pos, player2_resources, 2)
+            accumulator += frame_time
+            ticks = 0
+            while accumulator >= tick_dt and winner is None:
+                if ticks == MAX_CATCH_UP_TICKS:
+                    accumulator = 0.0
+                    break
+                inputs = {player_id: (read_move_direction(keys, player_id), actions[player_id]) for player_id in (1, 2)}
+                if bots:
+                    bot_inputs(sim, field, bots, inputs)
+                if recording is not None:
+                    recording.record(tick_dt, inputs)
+                previous_positions = unit_positions()
+                sim.step(tick_dt, inputs)
+                winner = handle_sim_events()
+                actions = {1: [], 2: []}
+                accumulator -= tick_dt
+                ticks += 1
+            profiler.lap("simulation")
 
             screen.blit(background_image, (0, 0))
             draw_grid()
-            draw_units()
+            profiler.lap("draw_grid")
+            draw_units(interpolated_positions(previous_positions, accumulator / tick_dt))
+            profiler.lap("draw_units")
             draw_ui()
-
-            particles[:] = [p for p in particles if p.update()]
-            for particle in particles:
-                particle.draw(screen)
-
-            game_state["remaining_time"] = max(0, game_state["game_duration"] - int(time.time() - game_state["start_time"]))
-            if game_state["remaining_time"] <= 0:
-                winner = determine_winner()
-                game_over_sound.play()
+            if show_event_overlay:
+                draw_event_overlay()
+            profiler.lap("draw_ui")
+
+            effect_particles.update()
+            presenter.track("particles", draw_effect_particles())
+            profiler.lap("particles")
+
+            if winner is not None:
+                record_match_result(winner)
+                if recording is not None:
+                    save_recording(recording)
+                    recording = None
+                sounds.play("game_over")
                 game_state["screen"] = "game_over" if winner != "Draw" else "game_draw"
 
-            collect_resources(player1_pos, player1_resources)
-            collect_resources(player2_pos, player2_resources)
-            generate_resources()
-            generate_building_resources()
-
         elif game_state["screen"] == "start":
             draw_start_screen()
             if dialogue_active:
@@ -1289,11 +1274,154 @@ def main():
             draw_game_over_screen(winner)
         elif game_state["screen"] == "game_draw":
             draw_game_draw_screen()
+        profiler.lap("draw_screen")
+
+        if show_profile_overlay:
+            draw_profile_overlay()
+        profiler.lap("overlay")
+        sounds.flush()
+        profiler.lap("sound")
+        presenter.present()
+        profiler.lap("present")
+        frame_time = clock.tick(FPS) / 1000.0
+        profiler.lap("tick")
+        profiler.end_frame()
+
+    event_log.close()
+    profiler.close()
+    score_store.close()
+    pygame.quit()
+
+def watch_replay(path, speed=1.0):
+    """
+    Plays a recorded match back at ``speed`` times real time. Recorded ticks are
+    consumed as the sped-up clock passes them, so the match ends exactly as it did
+    live. Esc or closing the window stops playback.
+    """
+    global sim, cameras
+    recording = Recording.load(path)
+    sim = recording.new_state(event_log)
+    cameras = create_cameras()
+    game_state["screen"] = "playing"
+    steps = recording.steps()
+    pending = next(steps, None)
+    budget = 0.0
+    clock = pygame.time.Clock()
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+
+        while pending is not None and pending[0] <= budget:
+            budget -= pending[0]
+            sim.step(*pending)
+            pending = next(steps, None)
+        winner = handle_sim_events()
+
+        if game_state["screen"] == "playing":
+            screen.blit(background_image, (0, 0))
+            draw_grid()
+            draw_units()
+            draw_ui()
+            effect_particles.update()
+            presenter.track("particles", draw_effect_particles())
+            if winner is not None:
+                game_state["screen"] = "game_over" if winner != "Draw" else "game_draw"
+        elif game_state["screen"] == "game_over":
+            draw_game_over_screen(sim.winner)
+        else:
+            draw_game_draw_screen()
 
-        pygame.display.flip()
+        sounds.flush()
+        presenter.present()
+        budget += clock.tick(FPS) / 1000.0 * speed
+
+    event_log.close()
+    pygame.quit()
+
+def play_online(address, seat=ANY_SEAT):
+    """
+    Joins a LAN host as ``seat`` (1, 2, 0 to spectate, or any free seat). Either set
+    of keys controls this client's player; the host runs the rules and this loop only
+    sends inputs and draws the mirrored match.
+    """
+    global sim, cameras
+    host, _, port = address.rpartition(":") if ":" in address else (address, "", str(DEFAULT_PORT))
+    client = GameClient(host or "localhost", int(port), seat)
+    client.start()
+    sim = client.state
+    cameras = create_cameras()
+    matches_seen = 0
+    clock = pygame.time.Clock()
+
+    running = True
+    while running:
+        actions = []
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_m:
+                    toggle_sound()
+                if event.key in ACTION_KEYS:
+                    actions.append(ACTION_KEYS[event.key][1])
+        keys = pygame.key.get_pressed()
+        if client.seat:
+            client.send_input(read_move_direction(keys, 1) or read_move_direction(keys, 2), actions)
+        if not client.poll():
+            running = False
+        winner = handle_sim_events()
+        if client.matches != matches_seen:
+            matches_seen = client.matches
+            game_state["screen"] = "playing"
+            # Players see through their own seat's fog, spectators through both
+            cameras = create_cameras((client.seat,) if client.seat in (1, 2) else (1, 2))
+
+        if client.matches == 0:
+            screen.blit(background_image, (0, 0))
+            waiting = render_text("Waiting for players...", int(HEIGHT * 0.06), WHITE)
+            screen.blit(waiting, waiting.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
+        elif game_state["screen"] == "playing":
+            screen.blit(background_image, (0, 0))
+            draw_grid()
+            draw_units(client.render_position)
+            draw_ui()
+            effect_particles.update()
+            presenter.track("particles", draw_effect_particles())
+            if winner is not None:
+                sounds.play("game_over")
+                game_state["screen"] = "game_over" if winner != "Draw" else "game_draw"
+        elif game_state["screen"] == "game_over":
+            draw_game_over_screen(sim.winner)
+        else:
+            draw_game_draw_screen()
+
+        sounds.flush()
+        presenter.present()
         clock.tick(FPS)
 
+    client.close()
+    event_log.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Two Player RTS Game")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded match instead of playing")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiple")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="join a LAN host started with network.py")
+    parser.add_argument("--player", type=int, default=ANY_SEAT, help="seat to take when joining: 1, 2 or 0 to spectate")
+    parser.add_argument("--bot", type=int, action="append", choices=[1, 2], default=[],
+                        help="let the computer play this seat (1 = Blue, 2 = Red); repeat for both")
+    parser.add_argument("--fps", type=int, default=FPS, help="frame rate cap; gameplay is the same at any rate")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE, help="game rule updates per second")
+    args = parser.parse_args()
+    FPS = args.fps
+    TICK_RATE = args.tick_rate
+    if args.replay:
+        watch_replay(args.replay, args.speed)
+    elif args.connect:
+        play_online(args.connect, args.player)
+    else:
+        main(args.bot)
\ No newline at end of file
@@ -0,0 +1,427 @@
+"""
+LAN play: an authoritative host runs the simulation and clients send it inputs.
+
+Messages travel over TCP (Nagle disabled) as a length-prefixed frame with a type
+byte. A client joining gets a full snapshot; after that the host sends a delta for
+every tick in which something changed: players whose visible state differs from
+what was last sent, the board cells the simulation marked as changed, and that tick's
+events. An idle tick costs nothing and a busy one a few dozen bytes, whatever the
+board size.
+
+    python network.py host --port 5555 --mode Hard --duration 60
+    python network.py bot --port 5555 --player 1     # headless client for testing
+    python main.py --connect localhost:5555 --player 2
+"""
+import argparse
+import asyncio
+import queue
+import random
+import socket
+import struct
+import threading
+import time
+
+from board import RESOURCE, BUILDING, OBSTACLE, RESOURCE_TYPES, BUILDING_TYPES, OBSTACLE_TYPES
+from simulation import GameState, DIRECTIONS
+from replay import INPUT_CODES, CODES
+import snapshot
+
+DEFAULT_PORT = 5555
+TICK_RATE = 60
+RESTART_DELAY = 5.0
+# Seconds a remote unit takes to slide to its new tile
+INTERPOLATION_TIME = 0.1
+
+# Payload length, message type
+FRAME = struct.Struct("<IB")
+MSG_HELLO = 1      # client -> host: requested seat
+MSG_INPUT = 2      # client -> host: held direction code, then one code per action
+MSG_WELCOME = 3    # host -> client: assigned seat
+MSG_SNAPSHOT = 4   # host -> client: snapshot.snapshot() of a new or joined match
+MSG_DELTA = 5      # host -> client: changes since the previous delta
+
+SPECTATOR = 0
+ANY_SEAT = 255
+SEATS = (1, 2)
+
+# tick, time, remaining time, winner, changed players, changed cells, events
+DELTA = struct.Struct("<IdiBBHH")
+# row, col, kind, resource type, amount, spawn time, building type, owner, last generated, obstacle type
+CELL = struct.Struct("<IIBBhfBBfB")
+# kind, player (or winner), x, y, a, b, value
+EVENT = struct.Struct("<BBhhhhd")
+EVENT_KINDS = ["move", "collect", "build", "penalty", "game_over"]
+
+
+def encode(kind, payload=b""):
+    return FRAME.pack(len(payload), kind) + payload
+
+
+async def read_message(reader):
+    length, kind = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(length)
+
+
+def decode_input(payload):
+    """
+    ``(direction, actions)`` from a MSG_INPUT payload; raises ValueError unless the
+    first code is a direction (or none) and every other code an action.
+    """
+    codes = list(payload)
+    if not codes or any(code >= len(INPUT_CODES) for code in codes):
+        raise ValueError("input code out of range")
+    direction = INPUT_CODES[codes[0]]
+    actions = [INPUT_CODES[code] for code in codes[1:]]
+    if (direction is not None and direction not in DIRECTIONS) or not all(isinstance(action, tuple) for action in actions):
+        raise ValueError("input code in the wrong slot")
+    return direction, actions
+
+
+def sync_key(player):
+    # What clients can see of a player. The move cooldown ticks down every tick but
+    # only the host needs it, so it alone never triggers an update.
+    upgrades = player.upgrades.upgrades
+    return (tuple(player.pos), tuple(player.target), tuple(player.resources.values()), player.on_obstacle,
+            tuple(upgrade.current_level for upgrade in upgrades.values()))
+
+
+def pack_cell(board, cell):
+    return CELL.pack(
+        cell[0], cell[1], board.kind[cell], board.resource_type[cell], board.resource_amount[cell],
+        board.resource_spawn_time[cell], board.building_type[cell], board.building_owner[cell],
+        board.building_last_generated[cell], board.obstacle_type[cell]
+    )
+
+
+def apply_cell(board, data, offset):
+    row, col, kind, resource_type, amount, spawn_time, building_type, owner, last_generated, obstacle_type = \
+        CELL.unpack_from(data, offset)
+    cell = (row, col)
+    # Go through the board setters so counts, production and free cells stay right
+    for flag in (RESOURCE, BUILDING, OBSTACLE):
+        if board.kind[cell] & flag:
+            board.clear_flag(cell, flag)
+    if kind & RESOURCE:
+        board.set_resource(cell, RESOURCE_TYPES[resource_type - 1], amount, spawn_time)
+    if kind & BUILDING:
+        board.set_building(cell, BUILDING_TYPES[building_type - 1], owner, last_generated)
+    if kind & OBSTACLE:
+        board.set_obstacle(cell, OBSTACLE_TYPES[obstacle_type - 1])
+    return cell
+
+
+def pack_event(event):
+    kind = event[0]
+    code = EVENT_KINDS.index(kind)
+    if kind == "move":
+        return EVENT.pack(code, event[1], 0, 0, 0, 0, 0.0)
+    if kind == "collect":
+        _, player_id, pos, collected, points = event
+        return EVENT.pack(code, player_id, pos[0], pos[1], collected["Gold"], collected["Wood"], points)
+    if kind == "build":
+        _, player_id, cell, building_type = event
+        return EVENT.pack(code, player_id, cell[0], cell[1], BUILDING_TYPES.index(building_type), 0, 0.0)
+    if kind == "penalty":
+        _, player_id, cell, amount = event
+        return EVENT.pack(code, player_id, cell[0], cell[1], 0, 0, amount)
+    return EVENT.pack(code, snapshot.WINNERS.index(event[1]), 0, 0, 0, 0, 0.0)
+
+
+def unpack_event(data, offset):
+    code, player_id, x, y, a, b, value = EVENT.unpack_from(data, offset)
+    kind = EVENT_KINDS[code]
+    if kind == "move":
+        return (kind, player_id)
+    if kind == "collect":
+        return (kind, player_id, (x, y), {"Gold": a, "Wood": b}, value)
+    if kind == "build":
+        return (kind, player_id, (x, y), BUILDING_TYPES[a])
+    if kind == "penalty":
+        return (kind, player_id, (x, y), value)
+    return (kind, snapshot.WINNERS[player_id])
+
+
+class GameHost:
+    """
+    Runs matches at a fixed tick rate once both seats are taken and streams them to
+    every connected client. Extra clients join as spectators.
+    """
+
+    def __init__(self, state, mode="Medium", duration=60, tick_rate=TICK_RATE, restart_delay=RESTART_DELAY):
+        self.state = state
+        self.mode = mode
+        self.duration = duration
+        self.tick_rate = tick_rate
+        self.restart_delay = restart_delay
+        self.clients = {}  # writer -> seat
+        self.held = {seat: None for seat in SEATS}
+        self.actions = {seat: [] for seat in SEATS}
+        self.sent_players = {}
+        self.playing = False
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Hosting on {host}:{port}, waiting for two players")
+        async with server:
+            await self.run_matches()
+
+    def assign_seat(self, requested):
+        taken = set(self.clients.values())
+        if requested in SEATS and requested not in taken:
+            return requested
+        if requested == ANY_SEAT:
+            for seat in SEATS:
+                if seat not in taken:
+                    return seat
+        return SPECTATOR
+
+    async def handle_client(self, reader, writer):
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        seat = None
+        try:
+            kind, payload = await read_message(reader)
+            if kind != MSG_HELLO or len(payload) != 1:
+                return
+            seat = self.assign_seat(payload[0])
+            self.clients[writer] = seat
+            writer.write(encode(MSG_WELCOME, bytes([seat])))
+            if self.playing:
+                writer.write(encode(MSG_SNAPSHOT, snapshot.snapshot(self.state)))
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == MSG_INPUT and seat != SPECTATOR and payload:
+                    # Checked before anything is stored, so malformed input never reaches
+                    # the simulation; the client that sent it is disconnected
+                    direction, actions = decode_input(payload)
+                    self.held[seat] = direction
+                    self.actions[seat].extend(actions)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if seat is not None:
+                del self.clients[writer]
+                if seat != SPECTATOR:
+                    self.held[seat] = None
+            writer.close()
+
+    def broadcast(self, message):
+        for writer in list(self.clients):
+            if not writer.is_closing():
+                writer.write(message)
+
+    async def run_matches(self):
+        while True:
+            while not set(SEATS) <= set(self.clients.values()):
+                await asyncio.sleep(0.1)
+            self.state.reset(self.mode, self.duration)
+            self.state.drain_changed_cells()
+            self.state.drain_events()
+            self.sent_players = {player.id: sync_key(player) for player in self.state.players}
+            self.playing = True
+            self.broadcast(encode(MSG_SNAPSHOT, snapshot.snapshot(self.state)))
+            await self.run_match()
+            self.playing = False
+            print(f"Match over: {self.state.winner}")
+            await asyncio.sleep(self.restart_delay)
+
+    async def run_match(self):
+        loop = asyncio.get_running_loop()
+        dt = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        while self.state.winner is None:
+            next_tick += dt
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            inputs = {}
+            for seat in SEATS:
+                inputs[seat] = (self.held[seat], self.actions[seat])
+                self.actions[seat] = []
+            previous_remaining = self.state.remaining_time
+            self.state.step(dt, inputs)
+            delta = self.encode_delta(previous_remaining)
+            if delta is not None:
+                self.broadcast(encode(MSG_DELTA, delta))
+
+    def encode_delta(self, previous_remaining):
+        state = self.state
+        players = []
+        for player in state.players:
+            key = sync_key(player)
+            if key != self.sent_players[player.id]:
+                self.sent_players[player.id] = key
+                players.append(bytes([player.id]) + snapshot.pack_player(player))
+        cells = state.drain_changed_cells()
+        events = state.drain_events()
+        if not (players or cells or events) and state.remaining_time == previous_remaining:
+            return None
+        header = DELTA.pack(state.tick, state.time, state.remaining_time, snapshot.WINNERS.index(state.winner),
+                            len(players), len(cells), len(events))
+        return b"".join([header] + players + [pack_cell(state.board, cell) for cell in cells]
+                        + [pack_event(event) for event in events])
+
+
+class GameClient:
+    """
+    Mirrors the host's match into a local GameState for the renderer.
+
+    The connection runs on its own thread with an asyncio loop; received messages
+    queue up until ``poll`` applies them on the caller's thread. Applied changes show
+    up in ``state.changed_cells`` and ``state.events`` exactly as if the simulation
+    had run locally, and ``render_position`` slides units between tiles.
+    """
+
+    def __init__(self, host, port, seat=ANY_SEAT):
+        self.host = host
+        self.port = port
+        self.requested_seat = seat
+        self.seat = None
+        self.state = GameState()
+        self.matches = 0
+        self.inbox = queue.SimpleQueue()
+        self.loop = None
+        self.writer = None
+        self.thread = None
+        self.connected = True
+        self.closing = False
+        self.bytes_received = 0
+        self.last_input = None
+        self.motion = {}  # player id -> (from pos, to pos, start time)
+
+    def start(self):
+        ready = threading.Event()
+        self.thread = threading.Thread(target=asyncio.run, args=(self.run(ready),), name="game-client", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    async def run(self, ready):
+        self.loop = asyncio.get_running_loop()
+        try:
+            reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.writer.write(encode(MSG_HELLO, bytes([self.requested_seat])))
+            ready.set()
+            while True:
+                kind, payload = await read_message(reader)
+                self.bytes_received += FRAME.size + len(payload)
+                self.inbox.put((kind, payload))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            if not self.closing:
+                print(f"Connection to host lost: {e}")
+        finally:
+            ready.set()
+            self.inbox.put((None, None))
+
+    def send(self, message):
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.writer.write, message)
+
+    def send_input(self, direction, actions):
+        # Only changes travel: a held direction is sent once, not every frame
+        if direction == self.last_input and not actions:
+            return
+        self.last_input = direction
+        self.send(encode(MSG_INPUT, bytes([CODES[direction]] + [CODES[action] for action in actions])))
+
+    def poll(self):
+        """Applies everything received so far. Returns False once disconnected."""
+        while True:
+            try:
+                kind, payload = self.inbox.get_nowait()
+            except queue.Empty:
+                return self.connected
+            if kind is None:
+                self.connected = False
+            elif kind == MSG_WELCOME:
+                self.seat = payload[0]
+            elif kind == MSG_SNAPSHOT:
+                snapshot.restore(self.state, payload)
+                self.motion = {}
+                self.matches += 1
+            elif kind == MSG_DELTA:
+                self.apply_delta(payload)
+
+    def apply_delta(self, data):
+        state = self.state
+        tick, state.time, state.remaining_time, winner, player_count, cell_count, event_count = DELTA.unpack_from(data)
+        state.tick = tick
+        state.winner = snapshot.WINNERS[winner]
+        offset = DELTA.size
+        now = time.perf_counter()
+        for _ in range(player_count):
+            player = state.player(data[offset])
+            start = self.render_position(player, now)
+            offset = snapshot.unpack_player(player, data, offset + 1)
+            if list(start) != player.pos:
+                self.motion[player.id] = (start, tuple(player.pos), now)
+        for _ in range(cell_count):
+            state.changed_cells.add(apply_cell(state.board, data, offset))
+            offset += CELL.size
+        for _ in range(event_count):
+            state.events.append(unpack_event(data, offset))
+            offset += EVENT.size
+
+    def render_position(self, player, now=None):
+        """Where to draw ``player`` as fractional (x, y), easing toward its latest tile."""
+        if player.id not in self.motion:
+            return tuple(player.pos)
+        start, end, start_time = self.motion[player.id]
+        t = min(1.0, ((now if now is not None else time.perf_counter()) - start_time) / INTERPOLATION_TIME)
+        if t >= 1.0:
+            del self.motion[player.id]
+            return end
+        return tuple(a + (b - a) * t for a, b in zip(start, end))
+
+    def close(self):
+        self.closing = True
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.writer.close)
+
+
+def run_bot(host, port, seat, seconds):
+    """A headless client wandering at random, for load testing on localhost."""
+    client = GameClient(host, port, seat)
+    client.start()
+    rng = random.Random()
+    directions = [None] + list(DIRECTIONS)
+    actions = [value for value in INPUT_CODES if isinstance(value, tuple)]
+    direction = None
+    start = time.perf_counter()
+    while client.poll() and time.perf_counter() - start < seconds:
+        if rng.random() < 0.05:
+            direction = rng.choice(directions)
+        client.send_input(direction, [rng.choice(actions)] if rng.random() < 0.01 else [])
+        client.state.drain_events()
+        client.state.drain_changed_cells()
+        time.sleep(1 / TICK_RATE)
+    elapsed = time.perf_counter() - start
+    players = client.state.players
+    print(f"seat {client.seat}: {client.matches} match(es), tick {client.state.tick}, "
+          f"Blue {players[0].resources['Points']} - Red {players[1].resources['Points']}, "
+          f"winner {client.state.winner}, {client.bytes_received / elapsed:.0f} bytes/s received")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LAN host and test client")
+    commands = parser.add_subparsers(dest="command", required=True)
+    host_parser = commands.add_parser("host", help="run an authoritative host")
+    host_parser.add_argument("--bind", default="0.0.0.0")
+    host_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    host_parser.add_argument("--mode", default="Medium", choices=["Easy", "Medium", "Hard"])
+    host_parser.add_argument("--duration", type=int, default=60)
+    host_parser.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    host_parser.add_argument("--seed", type=int)
+    bot_parser = commands.add_parser("bot", help="connect a headless random-input client")
+    bot_parser.add_argument("--host", default="localhost")
+    bot_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    bot_parser.add_argument("--player", type=int, default=ANY_SEAT, help="1, 2, or 0 to spectate")
+    bot_parser.add_argument("--seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.command == "host":
+        game_host = GameHost(GameState(seed=args.seed), args.mode, args.duration, args.tick_rate)
+        try:
+            asyncio.run(game_host.serve(args.bind, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        run_bot(args.host, args.port, args.player, args.seconds)
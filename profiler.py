@@ -0,0 +1,64 @@
+import csv
+from collections import deque
+from time import perf_counter_ns
+
+
+class FrameProfiler:
+    """
+    Splits each frame into named phases with perf_counter_ns laps.
+
+    Call ``begin_frame`` at the top of the loop and ``lap(phase)`` after each phase;
+    the time since the previous lap is charged to that phase. The last ``window``
+    frames are kept per phase for rolling percentiles, and with ``csv_path`` set every
+    frame is written as one CSV row of per-phase milliseconds.
+    """
+
+    def __init__(self, phases, window=300, csv_path=None):
+        self.phases = list(phases)
+        self.samples = {phase: deque(maxlen=window) for phase in self.phases + ["frame"]}
+        self.current = dict.fromkeys(self.phases, 0)
+        self.frame_start = 0
+        self.last_lap = 0
+        self.frame_count = 0
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path is not None:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame"] + self.phases + ["total"])
+
+    def begin_frame(self):
+        self.frame_start = self.last_lap = perf_counter_ns()
+
+    def lap(self, phase):
+        now = perf_counter_ns()
+        self.current[phase] += now - self.last_lap
+        self.last_lap = now
+
+    def end_frame(self):
+        total = self.last_lap - self.frame_start
+        current = self.current
+        for phase in self.phases:
+            self.samples[phase].append(current[phase])
+        self.samples["frame"].append(total)
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([self.frame_count] + [f"{current[p] / 1e6:.3f}" for p in self.phases] + [f"{total / 1e6:.3f}"])
+        self.current = dict.fromkeys(self.phases, 0)
+        self.frame_count += 1
+
+    def percentiles(self, phase, quantiles=(0.5, 0.95, 0.99)):
+        """Rolling percentiles for ``phase`` in milliseconds."""
+        samples = sorted(self.samples[phase])
+        if not samples:
+            return tuple(0.0 for _ in quantiles)
+        last = len(samples) - 1
+        return tuple(samples[min(last, int(q * len(samples)))] / 1e6 for q in quantiles)
+
+    def report(self):
+        return {phase: self.percentiles(phase) for phase in self.phases + ["frame"]}
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
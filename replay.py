@@ -0,0 +1,176 @@
+"""
+Match recording and headless replay.
+
+    python replay.py match.rtsr            # re-run a recording as fast as possible
+    python main.py --replay match.rtsr --speed 4   # watch it at 4x
+"""
+import struct
+import sys
+from array import array
+from time import perf_counter
+
+from simulation import GameState, DIRECTIONS
+
+MAGIC = b"RTSR"
+# Older recordings were made under different timing rules (version 1: movement
+# counted frames, version 2: timers fired after resource collection) and no longer replay
+VERSION = 3
+# magic, version, seed, grid size, duration, tick count, event count, mode length
+HEADER = struct.Struct("<4sHIIIIIB")
+
+# What a recorded input code means: 0-4 set the held direction (0 releases it), the
+# rest are one-off actions
+INPUT_CODES = [None] + list(DIRECTIONS) + [
+    ("upgrade", "resource_generation"),
+    ("upgrade", "movement_speed"),
+    ("upgrade", "vision_radius"),
+    ("build", "Gold Mine"),
+    ("build", "Lumber Mill")
+]
+CODES = {value: code for code, value in enumerate(INPUT_CODES)}
+UPGRADE_NAMES = ["resource_generation", "movement_speed", "vision_radius"]
+
+
+class Recording:
+    """
+    Everything needed to replay one match: its seed, settings and starting upgrade
+    levels, the ``dt`` of every tick, and the inputs as tick-stamped codes.
+
+    Held directions are stored only when they change, so a match costs eight bytes
+    per tick plus six bytes per key press.
+    """
+
+    def __init__(self, seed, grid_size, mode, duration, upgrade_levels):
+        self.seed = seed
+        self.grid_size = grid_size
+        self.mode = mode
+        self.duration = duration
+        # {player id: [level per UPGRADE_NAMES entry]} at the start of the match
+        self.upgrade_levels = upgrade_levels
+        self.dts = array('d')
+        self.event_ticks = array('I')
+        self.event_players = array('B')
+        self.event_codes = array('B')
+        self.held = {1: None, 2: None}
+
+    @classmethod
+    def start(cls, state):
+        """A new recording of the match ``state`` was just reset to."""
+        levels = {
+            player.id: [player.upgrades.upgrades[name].current_level for name in UPGRADE_NAMES]
+            for player in state.players
+        }
+        return cls(state.seed, state.grid_size, state.mode, state.duration, levels)
+
+    def __len__(self):
+        return len(self.dts)
+
+    def add_input(self, tick, player_id, value):
+        self.event_ticks.append(tick)
+        self.event_players.append(player_id)
+        self.event_codes.append(CODES[value])
+
+    def record(self, dt, inputs):
+        """Records one ``GameState.step(dt, inputs)`` call."""
+        tick = len(self.dts)
+        self.dts.append(dt)
+        for player_id, (direction, actions) in inputs.items():
+            if direction != self.held[player_id]:
+                self.held[player_id] = direction
+                self.add_input(tick, player_id, direction)
+            for action in actions:
+                self.add_input(tick, player_id, action)
+
+    def steps(self):
+        """Yields the ``(dt, inputs)`` of every recorded tick in order."""
+        held = {1: None, 2: None}
+        index = 0
+        count = len(self.event_ticks)
+        for tick, dt in enumerate(self.dts):
+            actions = {1: [], 2: []}
+            while index < count and self.event_ticks[index] == tick:
+                player_id = self.event_players[index]
+                value = INPUT_CODES[self.event_codes[index]]
+                if isinstance(value, tuple):
+                    actions[player_id].append(value)
+                else:
+                    held[player_id] = value
+                index += 1
+            yield dt, {player_id: (held[player_id], actions[player_id]) for player_id in (1, 2)}
+
+    def new_state(self, log=None):
+        """A GameState reset to the recorded match's starting point."""
+        state = GameState(self.grid_size, log=log)
+        for player in state.players:
+            for name, level in zip(UPGRADE_NAMES, self.upgrade_levels[player.id]):
+                player.upgrades.upgrades[name].current_level = level
+        state.reset(self.mode, self.duration, self.seed)
+        return state
+
+    def to_bytes(self):
+        mode = (self.mode or "").encode()
+        levels = array('B', self.upgrade_levels[1] + self.upgrade_levels[2])
+        return b"".join([
+            HEADER.pack(MAGIC, VERSION, self.seed, self.grid_size, self.duration,
+                        len(self.dts), len(self.event_ticks), len(mode)),
+            mode, levels.tobytes(), self.dts.tobytes(), self.event_ticks.tobytes(),
+            self.event_players.tobytes(), self.event_codes.tobytes()
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, grid_size, duration, tick_count, event_count, mode_length = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a match recording")
+        if version != VERSION:
+            raise ValueError(f"unsupported recording version {version}")
+        offset = HEADER.size
+        mode = data[offset:offset + mode_length].decode() or None
+        offset += mode_length
+
+        def take(typecode, count):
+            nonlocal offset
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(data[offset:offset + size])
+            offset += size
+            return values
+
+        levels = take('B', 2 * len(UPGRADE_NAMES)).tolist()
+        recording = cls(seed, grid_size, mode, duration, {1: levels[:len(UPGRADE_NAMES)], 2: levels[len(UPGRADE_NAMES):]})
+        recording.dts = take('d', tick_count)
+        recording.event_ticks = take('I', event_count)
+        recording.event_players = take('B', event_count)
+        recording.event_codes = take('B', event_count)
+        return recording
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def replay(recording, log=None):
+    """Re-runs ``recording`` headlessly and returns the final GameState."""
+    state = recording.new_state(log)
+    for dt, inputs in recording.steps():
+        state.step(dt, inputs)
+    return state
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python replay.py <recording>")
+        sys.exit(2)
+    recording = Recording.load(sys.argv[1])
+    start = perf_counter()
+    state = replay(recording)
+    elapsed = perf_counter() - start
+    blue, red = (player.resources["Points"] for player in state.players)
+    print(f"seed {recording.seed}, {recording.mode} mode, {len(recording)} ticks replayed in {elapsed:.3f} s "
+          f"({len(recording) / max(elapsed, 1e-9):.0f} ticks/s)")
+    print(f"winner: {state.winner}  Blue {blue} - Red {red}")
@@ -0,0 +1,67 @@
+import heapq
+import itertools
+
+
+class Timer:
+    """A handle to one scheduled callback; pass it to cancel or reschedule."""
+
+    def __init__(self, callback, args, priority):
+        self.callback = callback
+        self.args = args
+        self.priority = priority
+        self.due = None
+        # The live heap entry, or None once fired or cancelled
+        self.entry = None
+
+
+class Scheduler:
+    """
+    Callbacks on the simulated clock, kept in a min-heap of (due time, priority,
+    insertion order).
+
+    ``run(now)`` pops and fires only the timers that are due, so a tick costs
+    O(log n) per timer that fires and nothing for the ones still waiting, however
+    many there are. Cancelling blanks the timer's heap entry, which is skipped when
+    it reaches the top; rescheduling cancels and pushes a fresh entry under the same
+    handle. Timers due at the same time fire by ascending priority, which makes the
+    order independent of when they were scheduled.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+
+    def schedule(self, due, callback, *args, priority=0):
+        """Calls ``callback(*args)`` once the clock reaches ``due``; returns its Timer."""
+        timer = Timer(callback, args, priority)
+        self.reschedule(timer, due)
+        return timer
+
+    def reschedule(self, timer, due):
+        """Moves ``timer`` to ``due``; works on fired and cancelled timers too."""
+        self.cancel(timer)
+        timer.due = due
+        timer.entry = [due, timer.priority, next(self.counter), timer]
+        heapq.heappush(self.heap, timer.entry)
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None and timer.entry is not None:
+            timer.entry[-1] = None
+            timer.entry = None
+
+    def clear(self):
+        for entry in self.heap:
+            if entry[-1] is not None:
+                entry[-1].entry = None
+        self.heap = []
+
+    def run(self, now):
+        """Fires every timer due at or before ``now`` in order, including ones scheduled meanwhile."""
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            timer = heapq.heappop(heap)[-1]
+            if timer is None:
+                continue
+            timer.entry = None
+            timer.callback(*timer.args)
@@ -0,0 +1,468 @@
+import random
+
+from board import Board, OBSTACLE_TYPES
+from event_log import EventLog, DEBUG, INFO
+from scheduler import Scheduler
+
+# Game rules live here so matches can run without a display or mixer.
+# main.py owns the window, sounds and particles and reads events from GameState.
+
+GRID_SIZE = 10
+VISION_RADIUS = 2
+# Seconds between moves while a direction is held, before movement_speed upgrades
+MOVE_INTERVAL = 1 / 6
+RESOURCE_GENERATION_INTERVAL = 5
+BUILDING_GENERATION_INTERVAL = 5
+GOLD_GENERATION_AMOUNT = 1
+WOOD_GENERATION_AMOUNT = 1
+
+# Obstacle penalties
+BASE_PENALTIES = {
+    "Stone": {"initial": 10, "continuous": 5},  # Base points deducted
+    "Bomb": {"initial": 20, "continuous": 10},
+    "Spike": {"initial": 30, "continuous": 15}
+}
+# Resource each building type adds to its owner every production tick
+BUILDING_OUTPUT = {"Gold Mine": "Gold", "Lumber Mill": "Wood"}
+# What each building type costs to place and the points it is worth
+BUILDING_COSTS = {
+    "Gold Mine": {"resource": "Gold", "cost": 10, "points": 100},
+    "Lumber Mill": {"resource": "Wood", "cost": 10, "points": 75}
+}
+# Gold cost of the first level of each upgrade; every level doubles it
+UPGRADE_BASE_COSTS = {"resource_generation": 50, "movement_speed": 75, "vision_radius": 100}
+
+MODE_MULTIPLIERS = {"Easy": 0.5, "Medium": 1.0, "Hard": 1.5}  # Difficulty multipliers
+MODE_OBSTACLE_COUNTS = {"Medium": 3, "Hard": 5}
+OBSTACLE_CHECK_INTERVAL = 2.0  # Deduct points every 2 seconds
+# Timers due in the same tick fire in this order: obstacle penalties (player 1, then
+# player 2), the countdown, match end, resource spawns, building production
+TIMER_PRIORITIES = {"penalty": 0, "countdown": 2, "match_end": 3, "spawn": 4, "production": 5}
+
+DIRECTIONS = {
+    "up": (0, -1),
+    "down": (0, 1),
+    "left": (-1, 0),
+    "right": (1, 0)
+}
+
+
+class Upgrade:
+    def __init__(self, name, description, base_cost, max_level, effect_function):
+        self.name = name
+        self.description = description
+        self.base_cost = base_cost
+        self.max_level = max_level
+        self.current_level = 0
+        self.effect_function = effect_function
+
+    def can_upgrade(self, resources):
+        return resources >= self.get_current_cost()
+
+    def get_current_cost(self):
+        return self.base_cost * (2 ** self.current_level)
+
+    def apply_upgrade(self):
+        if self.current_level < self.max_level:
+            self.current_level += 1
+            return True
+        return False
+
+
+class PlayerUpgrades:
+    def __init__(self):
+        self.upgrades = {
+            'resource_generation': Upgrade('Resource Generation', 'Increase resource generation speed', UPGRADE_BASE_COSTS['resource_generation'], 5, self.modify_resource_generation),
+            'movement_speed': Upgrade('Movement Speed', 'Increase player movement speed', UPGRADE_BASE_COSTS['movement_speed'], 3, self.modify_movement_speed),
+            'vision_radius': Upgrade('Vision Radius', 'Expand player vision', UPGRADE_BASE_COSTS['vision_radius'], 3, self.modify_vision_radius)
+        }
+
+    def modify_resource_generation(self, current_value):
+        return current_value * (1 + 0.2 * self.upgrades['resource_generation'].current_level)
+
+    def modify_movement_speed(self, current_value):
+        return current_value * (1 + 0.15 * self.upgrades['movement_speed'].current_level)
+
+    def modify_vision_radius(self, current_value):
+        return current_value + self.upgrades['vision_radius'].current_level
+
+    def can_upgrade(self, upgrade_name, resources):
+        return self.upgrades[upgrade_name].can_upgrade(resources)
+
+    def upgrade(self, upgrade_name, resources):
+        upgrade = self.upgrades[upgrade_name]
+        if upgrade.can_upgrade(resources):
+            if upgrade.apply_upgrade():
+                return upgrade.get_current_cost()
+        return 0
+
+
+class Player:
+    def __init__(self, player_id):
+        self.id = player_id
+        self.pos = [0, 0]
+        self.target = [0, 0]
+        self.resources = {"Gold": 0, "Wood": 0, "Points": 0}
+        self.upgrades = PlayerUpgrades()
+        self.move_cooldown = MOVE_INTERVAL
+        self.on_obstacle = False
+        self.last_obstacle_deduction = 0
+
+    def move_interval(self):
+        """Seconds between moves, shortened by the movement_speed upgrade."""
+        return MOVE_INTERVAL / self.upgrades.modify_movement_speed(1.0)
+
+    def vision_radius(self):
+        """Cells this player can see in every direction, including the vision upgrade."""
+        return int(self.upgrades.modify_vision_radius(VISION_RADIUS))
+
+
+class GameState:
+    """
+    Owns the board, both players and the match timers.
+
+    Nothing in here touches pygame; ``step`` advances a simulated clock by ``dt`` so
+    matches can run as fast as the CPU allows. Anything the front end should react to
+    (sounds, particles, game over) is queued in ``events`` as plain tuples.
+
+    Every match draws from its own ``random.Random(seed)`` and its clock starts at zero,
+    so the same seed, starting upgrades and sequence of ``step`` calls always replay
+    the same match. Match seeds are drawn from the ``seed`` given here unless passed to
+    ``reset``.
+
+    Everything that happens on a schedule (resource spawns, building production,
+    repeated obstacle penalties, the countdown and the end of the match) is a timer in
+    ``timers``, so a tick only does work for the timers that are due. The timers are
+    derived from the plain fields (``last_resource_generation``, ``on_obstacle``, ...)
+    by ``schedule_timers``, which is how a restored snapshot picks up its schedule.
+    """
+
+    def __init__(self, grid_size=GRID_SIZE, seed=None, log=None):
+        self.grid_size = grid_size
+        self.log = log if log is not None else EventLog()
+        self.seeds = random.Random(seed)
+        self.seed = None
+        self.rng = random.Random()
+        self.players = [Player(1), Player(2)]
+        self.board = Board(grid_size)
+        self.mode = None
+        self.time = 0.0
+        self.tick = 0
+        self.start_time = 0.0
+        self.duration = 0
+        self.remaining_time = 0
+        self.last_resource_generation = 0.0
+        self.last_building_generation = 0.0
+        self.winner = None
+        self.events = []
+        # Board cells changed since the renderer last looked, and a counter bumped
+        # whenever the whole board is replaced
+        self.changed_cells = set()
+        self.generation = 0
+        self.timers = Scheduler()
+        self.schedule_timers()
+
+    def player(self, player_id):
+        return self.players[player_id - 1]
+
+    # Dict-like views over the board layers, keyed by (row, col)
+    @property
+    def resources(self):
+        return self.board.resources
+
+    @property
+    def buildings(self):
+        return self.board.buildings
+
+    @property
+    def obstacles(self):
+        return self.board.obstacles
+
+    @property
+    def free_cells(self):
+        return self.board.free_cells
+
+    def player_cells(self):
+        return {Board.cell_of(p.pos) for p in self.players}
+
+    def reset(self, mode=None, duration=0, seed=None):
+        self.seed = seed if seed is not None else self.seeds.getrandbits(32)
+        self.rng = rng = random.Random(self.seed)
+        self.time = 0.0
+        self.tick = 0
+        size = self.grid_size
+        self.mode = mode
+        self.duration = duration
+        self.remaining_time = duration
+        self.winner = None
+        self.events = []
+        self.board = Board(size)
+        self.changed_cells = set()
+        self.generation += 1
+
+        for player in self.players:
+            player.pos = [rng.randint(0, size - 1), rng.randint(0, size - 1)]
+            player.target = list(player.pos)
+            player.resources = {"Gold": 0, "Wood": 0, "Points": 0}
+            player.move_cooldown = MOVE_INTERVAL
+            player.on_obstacle = False
+            player.last_obstacle_deduction = 0
+
+        for _ in range(5):
+            x, y = rng.randint(0, size - 1), rng.randint(0, size - 1)
+            self.resources[(x, y)] = {"type": "Gold", "amount": 1}
+        for _ in range(5):
+            x, y = rng.randint(0, size - 1), rng.randint(0, size - 1)
+            self.resources[(x, y)] = {"type": "Wood", "amount": 1}
+
+        for cell in self.free_cells.sample(rng, MODE_OBSTACLE_COUNTS.get(mode, 0), self.player_cells()):
+            self.obstacles[cell] = rng.choice(OBSTACLE_TYPES)
+
+        self.start_time = self.time
+        self.last_resource_generation = self.time
+        self.last_building_generation = self.time
+        self.schedule_timers()
+
+    def schedule_timers(self):
+        """Rebuilds every timer from the match fields, replacing whatever was scheduled."""
+        timers = self.timers
+        timers.clear()
+        self.countdown_timer = None
+        if self.remaining_time > 1:
+            elapsed = self.duration - self.remaining_time
+            self.countdown_timer = timers.schedule(self.start_time + elapsed + 1, self.count_down,
+                                                   priority=TIMER_PRIORITIES["countdown"])
+        self.end_timer = timers.schedule(self.start_time + self.duration, self.end_match,
+                                         priority=TIMER_PRIORITIES["match_end"])
+        self.spawn_timer = timers.schedule(self.last_resource_generation + self.resource_interval(),
+                                           self.generate_resources, priority=TIMER_PRIORITIES["spawn"])
+        self.production_timer = timers.schedule(self.last_building_generation + BUILDING_GENERATION_INTERVAL,
+                                                self.generate_building_resources, priority=TIMER_PRIORITIES["production"])
+        self.penalty_timers = {}
+        for player in self.players:
+            if player.on_obstacle:
+                self.schedule_penalty(player)
+
+    def schedule_penalty(self, player):
+        timer = self.penalty_timers.get(player.id)
+        due = player.last_obstacle_deduction + OBSTACLE_CHECK_INTERVAL
+        if timer is None:
+            self.penalty_timers[player.id] = self.timers.schedule(
+                due, self.obstacle_penalty, player, priority=TIMER_PRIORITIES["penalty"] + player.id - 1)
+        else:
+            self.timers.reschedule(timer, due)
+
+    def step(self, dt, inputs=None):
+        """
+        Advance the match by one tick of ``dt`` seconds.
+
+        ``inputs`` maps a player id to ``(direction, actions)``: direction is a key of
+        DIRECTIONS or None, actions is a list of ``("upgrade", name)`` or
+        ``("build", building_type)`` tuples triggered this tick.
+        """
+        if self.winner is not None:
+            return
+        self.time += dt
+        self.tick += 1
+        inputs = inputs or {}
+
+        for player in self.players:
+            _, actions = inputs.get(player.id, (None, ()))
+            for action in actions:
+                self.apply_action(player, action)
+
+        for player in self.players:
+            direction, _ = inputs.get(player.id, (None, ()))
+            self.move_player(player, direction, dt)
+
+        self.timers.run(self.time)
+        if self.remaining_time <= 0:
+            self.winner = self.determine_winner()
+            self.events.append(("game_over", self.winner))
+            return
+
+        for player in self.players:
+            self.collect_resources(player)
+
+    def drain_events(self):
+        events = self.events
+        self.events = []
+        return events
+
+    def drain_changed_cells(self):
+        cells = self.changed_cells
+        self.changed_cells = set()
+        return cells
+
+    def apply_action(self, player, action):
+        kind, name = action
+        if kind == "upgrade":
+            if player.resources['Gold'] >= player.upgrades.upgrades[name].get_current_cost():
+                cost = player.upgrades.upgrade(name, player.resources['Gold'])
+                player.resources['Gold'] -= cost
+                if cost and name == "resource_generation":
+                    # Spawns speed up from the last one, not from the next
+                    self.timers.reschedule(self.spawn_timer, self.last_resource_generation + self.resource_interval())
+        elif kind == "build":
+            self.build_structure(player, name)
+
+    def move_player(self, player, direction, dt):
+        # The cooldown is simulated seconds, so pace does not depend on the tick rate.
+        # Rounding keeps sums of 1/60 s steps from landing a hair above zero.
+        player.move_cooldown = round(player.move_cooldown - dt, 9)
+        if player.move_cooldown > 0:
+            return
+        if direction is not None:
+            dx, dy = DIRECTIONS[direction]
+            x, y = player.target[0] + dx, player.target[1] + dy
+            if 0 <= x < self.grid_size and 0 <= y < self.grid_size:
+                player.target[:] = [x, y]
+                player.pos[:] = player.target
+                # Keep this tick's overshoot so the average pace is exactly move_interval()
+                player.move_cooldown = round(player.move_interval() + max(player.move_cooldown, -dt), 9)
+                self.events.append(("move", player.id))
+        self.check_obstacle_collision(player)
+
+    def collect_resources(self, player):
+        cell = Board.cell_of(player.pos)
+        if cell not in self.resources:
+            return 0
+        resource = self.resources.pop(cell)
+        self.changed_cells.add(cell)
+        amount = resource["amount"]
+        if resource["type"] == "Gold":
+            player.resources['Gold'] += amount
+            points = amount * 50
+        elif resource["type"] == "Wood":
+            player.resources['Wood'] += amount
+            points = amount * 30
+        else:
+            points = 0
+
+        if points > 0:
+            player.resources['Points'] += points
+        if self.log.enabled(INFO):
+            self.log.log(INFO, self.time, "collect", player=player.id, resource=resource["type"], amount=amount, cell=cell)
+        collected = {"Gold": amount if resource["type"] == "Gold" else 0, "Wood": amount if resource["type"] == "Wood" else 0}
+        self.events.append(("collect", player.id, tuple(player.pos), collected, points))
+        return points
+
+    def build_structure(self, player, building_type):
+        pos = Board.cell_of(player.pos)
+
+        if pos in self.buildings:
+            if self.log.enabled(DEBUG):
+                self.log.log(DEBUG, self.time, "build_blocked", player=player.id, building=building_type, cell=pos, reason="building")
+            return False
+        if pos in self.resources:
+            if self.log.enabled(DEBUG):
+                self.log.log(DEBUG, self.time, "build_blocked", player=player.id, building=building_type, cell=pos, reason="resource")
+            return False
+
+        if building_type not in BUILDING_COSTS:
+            return False
+        price = BUILDING_COSTS[building_type]
+        resource = price["resource"]
+        if player.resources[resource] < price["cost"]:
+            if self.log.enabled(DEBUG):
+                self.log.log(DEBUG, self.time, "build_blocked", player=player.id, building=building_type, cell=pos, reason=resource.lower())
+            return False
+
+        player.resources[resource] -= price["cost"]
+        self.buildings[pos] = {"type": building_type, "owner": player.id, "last_generated": self.time}
+        self.changed_cells.add(pos)
+        player.resources["Points"] += price["points"]
+        self.events.append(("build", player.id, pos, building_type))
+        if self.log.enabled(INFO):
+            self.log.log(INFO, self.time, "build", player=player.id, building=building_type, cell=pos)
+        return True
+
+    def resource_interval(self):
+        level = max(p.upgrades.upgrades['resource_generation'].current_level for p in self.players)
+        return RESOURCE_GENERATION_INTERVAL / (1 + 0.2 * level)
+
+    def count_down(self):
+        self.remaining_time -= 1
+        if self.remaining_time > 1:
+            self.timers.reschedule(self.countdown_timer, self.countdown_timer.due + 1)
+
+    def end_match(self):
+        # The winner is decided in step once every timer due this tick has fired
+        self.remaining_time = 0
+
+    def generate_resources(self):
+        if len(self.free_cells):
+            resource_cells = self.free_cells.sample(self.rng, self.rng.randint(1, 3), self.player_cells())
+            for cell in resource_cells:
+                resource_type = 'Gold' if len(self.resources) % 2 == 0 else 'Wood'
+                self.resources[cell] = {
+                    "type": resource_type,
+                    "amount": GOLD_GENERATION_AMOUNT if resource_type == 'Gold' else WOOD_GENERATION_AMOUNT,
+                    "spawn_time": self.time
+                }
+                self.changed_cells.add(cell)
+                if self.log.enabled(DEBUG):
+                    self.log.log(DEBUG, self.time, "spawn", resource=resource_type, cell=cell)
+        self.last_resource_generation = self.time
+        self.timers.reschedule(self.spawn_timer, self.time + self.resource_interval())
+
+    def generate_building_resources(self):
+        # Production comes from the per-owner counters, so a tick costs the same no
+        # matter how many buildings exist. Buildings keep their own last_generated
+        # time in the board for staggered production; it is not touched here.
+        for owner, counts in self.board.production.items():
+            owner_resources = self.player(owner).resources
+            for building_type, count in counts.items():
+                if count > 0:
+                    resource_type = BUILDING_OUTPUT[building_type]
+                    owner_resources[resource_type] += count
+                    if self.log.enabled(INFO):
+                        self.log.log(INFO, self.time, "produce", player=owner, building=building_type, resource=resource_type, amount=count)
+        self.last_building_generation = self.time
+        self.timers.reschedule(self.production_timer, self.time + BUILDING_GENERATION_INTERVAL)
+
+    def check_obstacle_collision(self, player):
+        pos = Board.cell_of(player.pos)
+        resources = player.resources
+
+        if pos in self.obstacles and resources["Points"] > 0:
+            # Handle initial collision; the repeated deduction is a timer from here on
+            if not player.on_obstacle:
+                obstacle_type = self.obstacles[pos]
+                initial_penalty = BASE_PENALTIES[obstacle_type]["initial"] * MODE_MULTIPLIERS.get(self.mode, 1.0)
+                resources["Points"] = max(0, resources["Points"] - initial_penalty)
+                self.events.append(("penalty", player.id, pos, initial_penalty))
+                if self.log.enabled(INFO):
+                    self.log.log(INFO, self.time, "penalty", player=player.id, obstacle=obstacle_type, cell=pos, points=initial_penalty, initial=True)
+                player.on_obstacle = True
+                player.last_obstacle_deduction = self.time
+                self.schedule_penalty(player)
+        else:
+            # Reset obstacle status when player is off the obstacle
+            player.on_obstacle = False
+            self.timers.cancel(self.penalty_timers.get(player.id))
+
+    def obstacle_penalty(self, player):
+        # Deduct points every OBSTACLE_CHECK_INTERVAL while the player stays on obstacles
+        pos = Board.cell_of(player.pos)
+        resources = player.resources
+        obstacle_type = self.obstacles.get(pos)
+        if obstacle_type is None or resources["Points"] <= 0:
+            player.on_obstacle = False
+            return
+        continuous_penalty = BASE_PENALTIES[obstacle_type]["continuous"] * MODE_MULTIPLIERS.get(self.mode, 1.0)
+        resources["Points"] = max(0, resources["Points"] - continuous_penalty)
+        self.events.append(("penalty", player.id, pos, continuous_penalty))
+        if self.log.enabled(INFO):
+            self.log.log(INFO, self.time, "penalty", player=player.id, obstacle=obstacle_type, cell=pos, points=continuous_penalty, initial=False)
+        player.last_obstacle_deduction = self.time
+        self.schedule_penalty(player)
+
+    def determine_winner(self):
+        blue_points = self.players[0].resources["Points"]
+        red_points = self.players[1].resources["Points"]
+        if blue_points > red_points:
+            return "Blue"
+        elif blue_points < red_points:
+            return "Red"
+        return "Draw"
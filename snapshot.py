@@ -0,0 +1,205 @@
+"""
+Versioned binary snapshots of a running match.
+
+A snapshot holds everything ``GameState.step`` depends on: the clock and timer fields,
+both random streams, each player's position, target, resources, cooldown, obstacle
+contact timer and upgrade levels, and the board layers. Pending front-end events
+and changed cells are not saved; restoring bumps the board generation instead so
+views redraw from scratch, and rebuilds the scheduled timers from the saved fields.
+"""
+import random
+import struct
+from array import array
+
+import numpy as np
+
+from board import Board, CELL_DTYPE
+from simulation import GameState, Player, MODE_MULTIPLIERS
+from replay import UPGRADE_NAMES
+
+MAGIC = b"RTSS"
+VERSION = 2
+# magic, version, grid size, seed (-1 if none), tick, generation, time, start time,
+# duration, remaining time, last resource generation, last building generation,
+# mode, winner
+HEADER = struct.Struct("<4sHIqIIddiiddBB")
+# pos x, y, target x, y, gold, wood, points, points is a float, move cooldown
+# (seconds), on obstacle, last obstacle deduction, one level per UPGRADE_NAMES entry
+PLAYER = struct.Struct("<6id?d?d" + "B" * len(UPGRADE_NAMES))
+# Mersenne Twister state: has gauss_next, gauss_next, then 625 words
+RNG = struct.Struct("<?d")
+RNG_WORDS = 625
+# Free cell count, followed by the free cells in index order
+FREE_CELLS = struct.Struct("<I")
+
+MODES = [None] + list(MODE_MULTIPLIERS)
+WINNERS = [None, "Blue", "Red", "Draw"]
+LAYERS = ["kind", "resource_type", "resource_amount", "resource_spawn_time",
+          "building_type", "building_owner", "building_last_generated", "obstacle_type"]
+# Bytes per board cell across all layers
+CELL_BYTES = sum(getattr(Board(1), name).itemsize for name in LAYERS)
+
+
+def pack_rng(rng):
+    _, words, gauss_next = rng.getstate()
+    return RNG.pack(gauss_next is not None, gauss_next or 0.0) + array('I', words).tobytes()
+
+
+def unpack_rng(rng, data, offset):
+    has_gauss, gauss_next = RNG.unpack_from(data, offset)
+    offset += RNG.size
+    words = array('I')
+    words.frombytes(data[offset:offset + RNG_WORDS * words.itemsize])
+    rng.setstate((3, tuple(words), gauss_next if has_gauss else None))
+    return offset + RNG_WORDS * words.itemsize
+
+
+def pack_player(player):
+    resources = player.resources
+    return PLAYER.pack(
+        *player.pos, *player.target, resources["Gold"], resources["Wood"], resources["Points"],
+        isinstance(resources["Points"], float), player.move_cooldown, player.on_obstacle, player.last_obstacle_deduction,
+        *(player.upgrades.upgrades[name].current_level for name in UPGRADE_NAMES)
+    )
+
+
+def unpack_player(player, data, offset):
+    values = PLAYER.unpack_from(data, offset)
+    player.pos = list(values[0:2])
+    player.target = list(values[2:4])
+    points = values[6] if values[7] else int(values[6])
+    player.resources = {"Gold": values[4], "Wood": values[5], "Points": points}
+    player.move_cooldown = values[8]
+    player.on_obstacle = values[9]
+    player.last_obstacle_deduction = values[10]
+    for name, level in zip(UPGRADE_NAMES, values[11:]):
+        player.upgrades.upgrades[name].current_level = level
+    return offset + PLAYER.size
+
+
+def snapshot(state):
+    """Serializes ``state`` to bytes."""
+    parts = [HEADER.pack(
+        MAGIC, VERSION, state.grid_size, -1 if state.seed is None else state.seed,
+        state.tick, state.generation, state.time, state.start_time, state.duration,
+        state.remaining_time, state.last_resource_generation, state.last_building_generation,
+        MODES.index(state.mode), WINNERS.index(state.winner)
+    )]
+    for player in state.players:
+        parts.append(pack_player(player))
+    parts.append(pack_rng(state.seeds))
+    parts.append(pack_rng(state.rng))
+    for name in LAYERS:
+        parts.append(getattr(state.board, name).tobytes())
+    free_cells = state.board.free_cells.cells
+    parts.append(FREE_CELLS.pack(len(free_cells)))
+    parts.append(np.frombuffer(free_cells, dtype=CELL_DTYPE).astype(np.uint32).tobytes())
+    return b"".join(parts)
+
+
+def restore(state, data):
+    """
+    Overwrites ``state`` in place with the match stored in ``data``. Everything is
+    parsed and checked before ``state`` is touched, so a damaged snapshot raises
+    ValueError and leaves the running match as it was.
+    """
+    try:
+        return apply(state, *parse(data, len(state.players)))
+    except struct.error as e:
+        raise ValueError(f"damaged snapshot: {e}")
+
+
+def parse(data, player_count):
+    if len(data) < HEADER.size:
+        raise ValueError("not a match snapshot")
+    header = HEADER.unpack_from(data)
+    magic, version, grid_size, mode, winner = header[0], header[1], header[2], header[12], header[13]
+    if magic != MAGIC:
+        raise ValueError("not a match snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    if mode >= len(MODES) or winner >= len(WINNERS):
+        raise ValueError("damaged snapshot: unknown mode or winner")
+    cells = grid_size * grid_size
+    offset = HEADER.size
+    board_offset = offset + player_count * PLAYER.size + 2 * (RNG.size + RNG_WORDS * 4)
+    free_offset = board_offset + cells * CELL_BYTES
+    if len(data) < free_offset + FREE_CELLS.size:
+        raise ValueError("damaged snapshot: truncated")
+    (free_count,) = FREE_CELLS.unpack_from(data, free_offset)
+    if len(data) != free_offset + FREE_CELLS.size + free_count * 4:
+        raise ValueError("damaged snapshot: wrong length")
+
+    players = []
+    for player_id in range(1, player_count + 1):
+        player = Player(player_id)
+        offset = unpack_player(player, data, offset)
+        if not all(0 <= value < grid_size for value in player.pos + player.target):
+            raise ValueError("damaged snapshot: player off the board")
+        players.append(player)
+    seeds, rng = random.Random(), random.Random()
+    offset = unpack_rng(seeds, data, offset)
+    offset = unpack_rng(rng, data, offset)
+
+    board = Board(grid_size)
+    for name in LAYERS:
+        layer = getattr(board, name)
+        layer[...] = np.frombuffer(data, layer.dtype, layer.size, offset).reshape(layer.shape)
+        offset += layer.nbytes
+    offset += FREE_CELLS.size
+    free_cells = np.frombuffer(data, np.uint32, free_count, offset)
+    if free_count and int(free_cells.max()) >= cells:
+        raise ValueError("damaged snapshot: free cell off the board")
+    board.rebuild_indexes(free_cells)
+    return header, players, seeds, rng, board
+
+
+def apply(state, header, players, seeds, rng, board):
+    (_, _, grid_size, seed, tick, generation, time, start_time, duration, remaining_time,
+     last_resource_generation, last_building_generation, mode, winner) = header
+    # Copied onto the existing players, which the front end keeps references to
+    for player, parsed in zip(state.players, players):
+        player.pos = parsed.pos
+        player.target = parsed.target
+        player.resources = parsed.resources
+        player.move_cooldown = parsed.move_cooldown
+        player.on_obstacle = parsed.on_obstacle
+        player.last_obstacle_deduction = parsed.last_obstacle_deduction
+        for name in UPGRADE_NAMES:
+            player.upgrades.upgrades[name].current_level = parsed.upgrades.upgrades[name].current_level
+    state.seeds.setstate(seeds.getstate())
+    state.rng.setstate(rng.getstate())
+
+    state.grid_size = grid_size
+    state.board = board
+    state.seed = None if seed < 0 else seed
+    state.tick = tick
+    state.time = time
+    state.start_time = start_time
+    state.duration = duration
+    state.remaining_time = remaining_time
+    state.last_resource_generation = last_resource_generation
+    state.last_building_generation = last_building_generation
+    state.mode = MODES[mode]
+    state.winner = WINNERS[winner]
+    state.events = []
+    state.changed_cells = set()
+    # Never reuse a generation a view may already have drawn
+    state.generation = max(state.generation, generation) + 1
+    state.schedule_timers()
+    return state
+
+
+def fork(state):
+    """An independent copy of ``state`` sharing only its event log."""
+    return restore(GameState(state.grid_size, log=state.log), snapshot(state))
+
+
+def save(state, path):
+    with open(path, "wb") as f:
+        f.write(snapshot(state))
+
+
+def load(state, path):
+    with open(path, "rb") as f:
+        return restore(state, f.read())
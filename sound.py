@@ -0,0 +1,83 @@
+import os
+
+import pygame
+
+
+class SoundService:
+    """
+    Plays sound effects on a fixed budget of reserved mixer channels per category.
+
+    Effects are decoded on first use. Calls to ``play`` only queue the sound and
+    repeated triggers of the same sound before the next ``flush`` are merged, so a
+    busy frame costs at most one voice per sound. When all of a category's channels
+    are busy, the new sound steals the lowest-priority, oldest voice if its own
+    priority is at least as high; otherwise it is dropped.
+    """
+
+    def __init__(self, sound_dir, channel_budgets):
+        self.sound_dir = sound_dir
+        self.specs = {}
+        self.sounds = {}
+        self.pending = []
+        self.channels = {}
+        self.voices = {}  # channel -> (priority, start order)
+        self.play_count = 0
+        self.enabled = pygame.mixer.get_init() is not None
+        if not self.enabled:
+            return
+
+        total = sum(channel_budgets.values())
+        pygame.mixer.set_num_channels(max(total, pygame.mixer.get_num_channels()))
+        # Reserved channels are never picked by Sound.play(), so the budgets hold
+        pygame.mixer.set_reserved(total)
+        index = 0
+        for category, budget in channel_budgets.items():
+            self.channels[category] = [pygame.mixer.Channel(index + i) for i in range(budget)]
+            index += budget
+
+    def register(self, name, filename, volume, category, priority=0):
+        self.specs[name] = (filename, volume, category, priority)
+
+    def get_sound(self, name):
+        if name in self.sounds:
+            return self.sounds[name]
+        filename, volume, _, _ = self.specs[name]
+        try:
+            sound = pygame.mixer.Sound(os.path.join(self.sound_dir, filename))
+            sound.set_volume(volume)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error loading sound {filename}: {e}")
+            sound = None
+        self.sounds[name] = sound
+        return sound
+
+    def play(self, name):
+        if name not in self.pending:
+            self.pending.append(name)
+
+    def flush(self):
+        pending = self.pending
+        self.pending = []
+        if not self.enabled:
+            return
+        for name in pending:
+            sound = self.get_sound(name)
+            if sound is None:
+                continue
+            _, _, category, priority = self.specs[name]
+            channel = self.pick_channel(self.channels[category], priority)
+            if channel is None:
+                continue
+            channel.play(sound)
+            self.play_count += 1
+            self.voices[channel] = (priority, self.play_count)
+
+    def pick_channel(self, channels, priority):
+        victim = None
+        for channel in channels:
+            if not channel.get_busy():
+                return channel
+            voice = self.voices.get(channel, (0, 0))
+            if voice[0] <= priority and (victim is None or voice < self.voices.get(victim, (0, 0))):
+                victim = channel
+        return victim
@@ -0,0 +1,278 @@
+"""
+Bot-vs-bot tournaments for balance testing.
+
+Plays matches headlessly across a multiprocessing pool, with the same bot in both
+seats and a fixed simulated tick, so a 60 second match costs a fraction of a second
+instead of a minute. Every seed is played twice, the second time with the two start
+positions swapped between the seats, and each point of the parameter grid replays the
+same seeds, so differences between seats and between grid points come from the rules
+and the parameters rather than from the boards that happened to be drawn.
+
+Parameters are paths into the balance constants in simulation.py, a dotted key for
+each level of a nested dict:
+
+    python tournament.py --matches 1000
+    python tournament.py --sweep MODE_MULTIPLIERS.Hard=1,1.5,2 --sweep RESOURCE_GENERATION_INTERVAL=3,5,8
+    python tournament.py --sweep "BUILDING_COSTS.Gold Mine.cost=5,10,20" --format parquet
+
+Two tables are written: one row per match (``<output>_matches``) and one row per
+grid point (``<output>_summary``) with win rates, score distributions and match
+length stats. Win rates come per seat (Blue, Red) and seat-corrected: per start
+position, each of which is played once from each seat, plus the seat advantage
+(Blue minus Red win rate), which board luck cancels out of. Parquet needs pandas
+with pyarrow; without them CSV is written instead.
+"""
+import argparse
+import copy
+import csv
+import itertools
+import multiprocessing
+import random
+import sys
+from time import perf_counter
+
+import numpy as np
+
+import simulation
+from simulation import GameState, MODE_MULTIPLIERS
+from bot import DistanceField, Bot, bot_inputs
+
+TICK_RATE = 60
+DEFAULT_OUTPUT = "tournament"
+# Constants a sweep may change; each match starts from these defaults
+TUNABLE = [
+    "BASE_PENALTIES", "MODE_MULTIPLIERS", "BUILDING_COSTS", "UPGRADE_BASE_COSTS",
+    "RESOURCE_GENERATION_INTERVAL", "BUILDING_GENERATION_INTERVAL", "OBSTACLE_CHECK_INTERVAL",
+    "GOLD_GENERATION_AMOUNT", "WOOD_GENERATION_AMOUNT", "MODE_OBSTACLE_COUNTS"
+]
+DEFAULTS = {name: copy.deepcopy(getattr(simulation, name)) for name in TUNABLE}
+QUANTILES = (10, 50, 90)
+
+
+def resolve(path):
+    """The default value at ``path``; raises ValueError unless it names a number."""
+    name, *keys = path.split(".")
+    if name not in DEFAULTS:
+        raise ValueError(f"{name} is not tunable; choose from {', '.join(TUNABLE)}")
+    value = DEFAULTS[name]
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            raise ValueError(f"{path}: no key {key!r}")
+        value = value[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{path} is not a number")
+    return value
+
+
+def parse_value(text, default):
+    # Integer constants stay integers unless a fractional value is asked for
+    value = float(text)
+    return int(value) if isinstance(default, int) and value.is_integer() else value
+
+
+def parse_sweep(text):
+    """``PATH=v1,v2,...`` -> (path, [values])."""
+    path, separator, values = text.partition("=")
+    if not separator or not values:
+        raise argparse.ArgumentTypeError(f"expected PATH=v1,v2,... but got {text!r}")
+    try:
+        default = resolve(path)
+        parsed = [parse_value(value, default) for value in values.split(",")]
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return path, parsed
+
+
+def restore_defaults(target, default):
+    # In place, so modules holding a reference to the dict (bot.py) see the change
+    for key, value in default.items():
+        if isinstance(value, dict):
+            restore_defaults(target[key], value)
+        else:
+            target[key] = value
+
+
+def apply_parameters(params):
+    """Resets every TUNABLE constant in simulation, then applies ``params`` (path -> value)."""
+    for name, default in DEFAULTS.items():
+        if isinstance(default, dict):
+            restore_defaults(getattr(simulation, name), default)
+        else:
+            setattr(simulation, name, default)
+    for path, value in params.items():
+        name, *keys = path.split(".")
+        if not keys:
+            setattr(simulation, name, value)
+            continue
+        target = getattr(simulation, name)
+        for key in keys[:-1]:
+            target = target[key]
+        target[keys[-1]] = value
+
+
+def play_match(task):
+    """
+    Plays one bot-vs-bot match; ``task`` is (grid point, params, match, seed, swapped,
+    mode, duration, grid size, max buildings). ``swapped`` plays the seed's board with
+    the two start positions exchanged between the seats.
+    """
+    point, params, match, seed, swapped, mode, duration, grid_size, max_buildings = task
+    apply_parameters(params)
+    # Upgrade costs are read when the players are created, so build the state afterwards
+    state = GameState(grid_size)
+    state.reset(mode, duration, seed)
+    blue, red = state.players
+    if swapped:
+        blue.pos, red.pos = red.pos, blue.pos
+        blue.target, red.target = red.target, blue.target
+    field = DistanceField(state)
+    bots = [Bot(1, field, max_buildings), Bot(2, field, max_buildings)]
+    dt = 1.0 / TICK_RATE
+    leader = None
+    lead_changes = 0
+    settled_at = 0.0
+    start = perf_counter()
+    while state.winner is None:
+        state.step(dt, bot_inputs(state, field, bots))
+        state.drain_events()
+        state.drain_changed_cells()
+        difference = blue.resources["Points"] - red.resources["Points"]
+        current = "Blue" if difference > 0 else "Red" if difference < 0 else None
+        if current != leader:
+            if current is not None and leader is not None:
+                lead_changes += 1
+            leader = current
+            settled_at = state.time - state.start_time
+    wall_ms = (perf_counter() - start) * 1000
+    production = state.board.production
+    return {
+        "point": point,
+        "match": match,
+        "seed": seed,
+        "swapped": swapped,
+        "mode": mode,
+        "winner": state.winner,
+        "blue_points": blue.resources["Points"],
+        "red_points": red.resources["Points"],
+        "margin": blue.resources["Points"] - red.resources["Points"],
+        "ticks": state.tick,
+        "lead_changes": lead_changes,
+        "settled_at": round(settled_at, 3),
+        "blue_buildings": sum(production.get(1, {}).values()),
+        "red_buildings": sum(production.get(2, {}).values()),
+        "blue_upgrades": sum(u.current_level for u in blue.upgrades.upgrades.values()),
+        "red_upgrades": sum(u.current_level for u in red.upgrades.upgrades.values()),
+        "wall_ms": round(wall_ms, 2)
+    }
+
+
+def grid(sweeps):
+    """Every combination of the swept values as a list of {path: value} dicts."""
+    paths = [path for path, _ in sweeps]
+    return [dict(zip(paths, values)) for values in itertools.product(*(values for _, values in sweeps))]
+
+
+def summarize(points, rows):
+    """One row per grid point with win rates, score distributions and match length stats."""
+    by_point = {}
+    for row in rows:
+        by_point.setdefault(row["point"], []).append(row)
+    summary = []
+    for point, params in enumerate(points):
+        matches = by_point.get(point, [])
+        if not matches:
+            continue
+        count = len(matches)
+        entry = {"point": point, **params, "matches": count}
+        for winner in ("Blue", "Red", "Draw"):
+            entry[f"{winner.lower()}_win_rate"] = round(sum(row["winner"] == winner for row in matches) / count, 4)
+        entry["seat_advantage"] = round(entry["blue_win_rate"] - entry["red_win_rate"], 4)
+        # Start A is where the seed puts Blue; it is Red's start in the swapped match
+        for start, seat in (("a", "Blue"), ("b", "Red")):
+            other = "Red" if seat == "Blue" else "Blue"
+            wins = sum(row["winner"] == (other if row["swapped"] else seat) for row in matches)
+            entry[f"start_{start}_win_rate"] = round(wins / count, 4)
+        for column in ("blue_points", "red_points", "margin", "settled_at", "lead_changes",
+                       "blue_buildings", "red_buildings", "blue_upgrades", "red_upgrades"):
+            values = np.array([row[column] for row in matches], dtype=float)
+            entry[f"{column}_mean"] = round(float(values.mean()), 3)
+            entry[f"{column}_std"] = round(float(values.std()), 3)
+            for q, value in zip(QUANTILES, np.percentile(values, QUANTILES)):
+                entry[f"{column}_p{q}"] = round(float(value), 3)
+        entry["ticks_mean"] = round(sum(row["ticks"] for row in matches) / count, 1)
+        entry["wall_ms_mean"] = round(sum(row["wall_ms"] for row in matches) / count, 2)
+        summary.append(entry)
+    return summary
+
+
+def write_table(rows, path, table_format):
+    """Writes ``rows`` (dicts with the same keys) and returns the path written."""
+    if table_format == "parquet":
+        try:
+            import pandas
+            pandas.DataFrame(rows).to_parquet(path + ".parquet", index=False)
+            return path + ".parquet"
+        except ImportError as e:
+            print(f"Parquet unavailable ({e}); writing CSV instead")
+    with open(path + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return path + ".csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot-vs-bot balance tournaments")
+    parser.add_argument("--matches", type=int, default=100,
+                        help="seeds per grid point; each is played from both seats, so twice as many matches")
+    parser.add_argument("--sweep", type=parse_sweep, action="append", default=[], metavar="PATH=v1,v2,...",
+                        help="values to try for a balance constant, e.g. BASE_PENALTIES.Stone.initial=5,10")
+    parser.add_argument("--mode", default="Medium", choices=list(MODE_MULTIPLIERS))
+    parser.add_argument("--duration", type=int, default=60, help="match length in seconds")
+    parser.add_argument("--grid-size", type=int, default=simulation.GRID_SIZE)
+    parser.add_argument("--max-buildings", type=int, default=3, help="buildings of each type a bot places before saving for upgrades")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the per-match seeds")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="prefix of the output files")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    args = parser.parse_args()
+
+    points = grid(args.sweep)
+    seeds = random.Random(args.seed)
+    match_seeds = [seeds.getrandbits(32) for _ in range(args.matches)]
+    tasks = [(point, params, match, seed, swapped, args.mode, args.duration, args.grid_size, args.max_buildings)
+             for point, params in enumerate(points) for match, seed in enumerate(match_seeds) for swapped in (False, True)]
+    workers = args.workers or multiprocessing.cpu_count()
+    print(f"{len(tasks)} matches ({len(points)} grid point(s) x {args.matches} seeds x 2 seats) on {workers} worker(s)")
+
+    rows = []
+    start = perf_counter()
+    last_report = start
+    with multiprocessing.Pool(workers) as pool:
+        for row in pool.imap_unordered(play_match, tasks, chunksize=max(1, len(tasks) // (workers * 16))):
+            rows.append(row)
+            now = perf_counter()
+            if now - last_report >= 5 or len(rows) == len(tasks):
+                last_report = now
+                print(f"  {len(rows)}/{len(tasks)} matches, {len(rows) / (now - start):.1f} matches/s")
+    elapsed = perf_counter() - start
+    simulated = len(rows) * args.duration
+    print(f"Played {simulated / 3600:.1f} h of matches in {elapsed:.1f} s ({simulated / elapsed:.0f}x real time)")
+
+    rows.sort(key=lambda row: (row["point"], row["match"], row["swapped"]))
+    for row in rows:
+        row.update(points[row["point"]])
+    print(f"Wrote {write_table(rows, args.output + '_matches', args.format)}")
+    summary = summarize(points, rows)
+    print(f"Wrote {write_table(summary, args.output + '_summary', args.format)}")
+    for entry in summary:
+        params = ", ".join(f"{path}={entry[path]}" for path in points[entry["point"]]) or "defaults"
+        print(f"  {params}: Blue {entry['blue_win_rate']:.1%}  Red {entry['red_win_rate']:.1%}  "
+              f"Draw {entry['draw_win_rate']:.1%}  seat advantage {entry['seat_advantage']:+.1%}  "
+              f"start A {entry['start_a_win_rate']:.1%}  start B {entry['start_b_win_rate']:.1%}  "
+              f"margin {entry['margin_mean']:+.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())